@@ -0,0 +1,449 @@
+import os
+import io
+import stat
+import gzip
+import lzma
+import zlib
+import struct
+import tarfile
+import logging
+import datetime
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from file_entry import as_entry
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_FORMATS = ('zip', 'tar.gz', 'tar.xz', 'tar.zst')
+
+INCOMPRESSIBLE_EXTENSIONS = {
+    '.jpg', '.jpeg', '.png', '.gif', '.webp', '.heic', '.pdf',
+    '.zip', '.gz', '.tgz', '.bz2', '.xz', '.zst', '.7z', '.rar', '.jar', '.whl',
+    '.docx', '.xlsx', '.pptx', '.odt',
+    '.mp3', '.aac', '.ogg', '.flac', '.mp4', '.mkv', '.avi', '.mov', '.webm',
+}
+
+CHUNK_SIZE = 8 * 1024 * 1024
+BATCH_BYTES = 1024 * 1024
+PROBE_SIZE = 4096
+
+ZIP_STORED = 0
+ZIP_DEFLATED = 8
+ZIP64_LIMIT = (1 << 31) - 1
+_MAX_32 = 0xFFFFFFFF
+_MAX_16 = 0xFFFF
+
+
+def archive_format(path):
+    for fmt in sorted(ARCHIVE_FORMATS, key=len, reverse=True):
+        if path.endswith('.' + fmt):
+            return fmt
+    return None
+
+
+def looks_incompressible(sample):
+    if len(sample) < 64:
+        return False
+    return len(zlib.compress(sample, 1)) > 0.95 * len(sample)
+
+
+# -- CRC-32 combination (zlib's crc32_combine) so file chunks can be checksummed in parallel
+
+def _gf2_times(matrix, vector):
+    total = 0
+    row = 0
+    while vector:
+        if vector & 1:
+            total ^= matrix[row]
+        vector >>= 1
+        row += 1
+    return total
+
+
+def _gf2_square(matrix):
+    return [_gf2_times(matrix, matrix[n]) for n in range(32)]
+
+
+def crc32_combine(crc1, crc2, len2):
+    if len2 <= 0:
+        return crc1
+    odd = [0xEDB88320] + [1 << n for n in range(31)]
+    even = _gf2_square(odd)
+    odd = _gf2_square(even)
+    while True:
+        even = _gf2_square(odd)
+        if len2 & 1:
+            crc1 = _gf2_times(even, crc1)
+        len2 >>= 1
+        if not len2:
+            break
+        odd = _gf2_square(even)
+        if len2 & 1:
+            crc1 = _gf2_times(odd, crc1)
+        len2 >>= 1
+        if not len2:
+            break
+    return crc1 ^ crc2
+
+
+# -- worker side
+
+def _compress_piece(piece):
+    member_id, path, offset, length, method, level, final = piece
+    try:
+        with open(path, 'rb') as f:
+            mode = os.fstat(f.fileno()).st_mode
+            f.seek(offset)
+            data = f.read(length)
+    except OSError as e:
+        return member_id, final, None, None, 0, 0, str(e), 0
+
+    if method is None:
+        method = ZIP_STORED if looks_incompressible(data[:PROBE_SIZE]) else ZIP_DEFLATED
+    crc = zlib.crc32(data)
+    if method == ZIP_DEFLATED:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+        # Non-final chunks end on a byte boundary so the raw streams can be concatenated
+        payload = compressor.compress(data) + compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+    else:
+        payload = data
+    return member_id, final, method, payload, crc, len(data), None, mode
+
+
+def _compress_batch(pieces):
+    return [_compress_piece(piece) for piece in pieces]
+
+
+def _compress_block(fmt, level, block):
+    if fmt == 'tar.gz':
+        return gzip.compress(block, compresslevel=level)
+    if fmt == 'tar.xz':
+        return lzma.compress(block, preset=level)
+    return zstandard.ZstdCompressor(level=level).compress(block)
+
+
+# -- zip
+
+def _dos_datetime(timestamp):
+    moment = datetime.datetime.fromtimestamp(timestamp)
+    if moment.year < 1980:
+        moment = datetime.datetime(1980, 1, 1)
+    date = (moment.year - 1980) << 9 | moment.month << 5 | moment.day
+    time = moment.hour << 11 | moment.minute << 5 | moment.second // 2
+    return date, time
+
+
+class _ZipMember:
+    __slots__ = ('arcname', 'mtime', 'mode', 'size', 'method', 'single', 'zip64',
+                 'header_offset', 'crc', 'compressed', 'uncompressed', 'failed')
+
+    def __init__(self, arcname, mtime, size, method, single, mode=stat.S_IFREG | 0o644):
+        self.arcname = arcname.encode('utf-8')
+        self.mtime = mtime
+        # Replaced by the file's real st_mode once a worker has opened it
+        self.mode = mode
+        self.size = size
+        self.method = method
+        self.single = single
+        self.zip64 = size * 1.05 > ZIP64_LIMIT
+        self.header_offset = None
+        self.crc = 0
+        self.compressed = 0
+        self.uncompressed = 0
+        self.failed = False
+
+    @property
+    def flags(self):
+        flags = 0 if self.single else 0x08
+        try:
+            self.arcname.decode('ascii')
+        except UnicodeDecodeError:
+            flags |= 0x800
+        return flags
+
+    @property
+    def version(self):
+        return 45 if self.zip64 else 20
+
+    @property
+    def external_attributes(self):
+        # Unix mode in the high word; 0x10 is the MS-DOS directory flag
+        return self.mode << 16 | (0x10 if stat.S_ISDIR(self.mode) else 0)
+
+
+class ZipArchiveWriter:
+    """Writes a zip archive whose entries are compressed on a process pool.
+
+    Small files are compressed in batches; files larger than chunk_size are
+    split into raw-deflate pieces (the pigz approach) whose CRCs are merged
+    with crc32_combine. Results are written strictly in submission order.
+    Directories (including empty ones) are stored as entries first, and every
+    entry carries its Unix mode, so executable bits survive extraction.
+    """
+
+    def __init__(self, archive_path, level=6, workers=None, chunk_size=CHUNK_SIZE, probe=True):
+        self.archive_path = archive_path
+        self.level = level
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.probe = probe
+        self.members = []
+
+    def _method(self, entry, single):
+        if entry.extension in INCOMPRESSIBLE_EXTENSIONS:
+            return ZIP_STORED
+        if not self.probe:
+            return ZIP_DEFLATED
+        if single:
+            return None  # probed by the worker, which reads the data anyway
+        with open(entry.path, 'rb') as f:
+            return ZIP_STORED if looks_incompressible(f.read(PROBE_SIZE)) else ZIP_DEFLATED
+
+    def _jobs(self, source_dir, files, states):
+        batch = []
+        batch_bytes = 0
+        for file in files:
+            entry = as_entry(file)
+            arcname = os.path.relpath(entry.path, source_dir).replace(os.sep, '/')
+            single = entry.size <= self.chunk_size
+            try:
+                method = self._method(entry, single)
+            except OSError as e:
+                logger.error("Failed to archive %s: %s", entry.path, e)
+                continue
+            member_id = len(states)
+            states.append(_ZipMember(arcname, entry.mtime, entry.size, method, single))
+
+            if single:
+                batch.append((member_id, entry.path, 0, self.chunk_size, method, self.level, True))
+                batch_bytes += entry.size
+                if batch_bytes >= BATCH_BYTES or len(batch) >= 256:
+                    yield batch
+                    batch, batch_bytes = [], 0
+                continue
+
+            if batch:
+                yield batch
+                batch, batch_bytes = [], 0
+            for offset in range(0, entry.size, self.chunk_size):
+                final = offset + self.chunk_size >= entry.size
+                yield [(member_id, entry.path, offset, self.chunk_size, method, self.level, final)]
+        if batch:
+            yield batch
+
+    def _local_header(self, member):
+        extra = b''
+        if member.single:
+            crc, compressed, uncompressed = member.crc, member.compressed, member.uncompressed
+        else:
+            crc = compressed = uncompressed = 0
+        if member.zip64:
+            extra = struct.pack('<HHQQ', 1, 16, uncompressed, compressed)
+            compressed = uncompressed = _MAX_32
+        date, time = _dos_datetime(member.mtime)
+        header = struct.pack(
+            '<4s2B4HL2L2H', b'PK\x03\x04', member.version, 0, member.flags, member.method,
+            time, date, crc, compressed, uncompressed, len(member.arcname), len(extra)
+        )
+        return header + member.arcname + extra
+
+    def _descriptor(self, member):
+        if member.zip64:
+            return struct.pack('<4sLQQ', b'PK\x07\x08', member.crc, member.compressed, member.uncompressed)
+        return struct.pack('<4sLLL', b'PK\x07\x08', member.crc, member.compressed, member.uncompressed)
+
+    def _central_record(self, member):
+        overflow = []
+        uncompressed, compressed, offset = member.uncompressed, member.compressed, member.header_offset
+        if uncompressed > ZIP64_LIMIT or member.zip64:
+            overflow.append(uncompressed)
+            uncompressed = _MAX_32
+        if compressed > ZIP64_LIMIT or member.zip64:
+            overflow.append(compressed)
+            compressed = _MAX_32
+        if offset > ZIP64_LIMIT:
+            overflow.append(offset)
+            offset = _MAX_32
+        extra = b''
+        if overflow:
+            extra = struct.pack(f'<HH{len(overflow)}Q', 1, 8 * len(overflow), *overflow)
+        date, time = _dos_datetime(member.mtime)
+        version = 45 if overflow else 20
+        record = struct.pack(
+            '<4s4B4HL2L5H2L', b'PK\x01\x02', version, 3, version, 0, member.flags, member.method,
+            time, date, member.crc, compressed, uncompressed, len(member.arcname), len(extra),
+            0, 0, 0, member.external_attributes, offset
+        )
+        return record + member.arcname + extra
+
+    def _write_piece(self, out, states, result):
+        member_id, final, method, payload, crc, length, error, mode = result
+        member = states[member_id]
+        if member.failed:
+            return
+        if error is not None:
+            logger.error("Failed to archive %s: %s", member.arcname.decode('utf-8'), error)
+            member.failed = True
+            if member.header_offset is not None:
+                # Pieces of one member are contiguous, so the partial entry can be cut off
+                out.seek(member.header_offset)
+                out.truncate()
+            return
+
+        first = member.header_offset is None
+        if first:
+            member.header_offset = out.tell()
+            member.method = method
+            member.mode = mode
+        member.crc = crc32_combine(member.crc, crc, length) if not first else crc
+        member.compressed += len(payload)
+        member.uncompressed += length
+        if first:
+            out.write(self._local_header(member))
+        out.write(payload)
+
+        if final:
+            if not member.single:
+                out.write(self._descriptor(member))
+            self.members.append(member)
+
+    def _write_end(self, out):
+        cd_offset = out.tell()
+        for member in self.members:
+            out.write(self._central_record(member))
+        cd_size = out.tell() - cd_offset
+        count = len(self.members)
+
+        if count > _MAX_16 or cd_offset > ZIP64_LIMIT or cd_size > ZIP64_LIMIT:
+            eocd64_offset = out.tell()
+            out.write(struct.pack('<4sQ2H2L4Q', b'PK\x06\x06', 44, 45, 45, 0, 0,
+                                  count, count, cd_size, cd_offset))
+            out.write(struct.pack('<4sLQL', b'PK\x06\x07', 0, eocd64_offset, 1))
+            count = min(count, _MAX_16)
+            cd_size = min(cd_size, _MAX_32)
+            cd_offset = min(cd_offset, _MAX_32)
+        out.write(struct.pack('<4s4H2LH', b'PK\x05\x06', 0, 0, count, count, cd_size, cd_offset, 0))
+
+    def _write_directory(self, out, arcname, stats):
+        member = _ZipMember(arcname + '/', stats.st_mtime, 0, ZIP_STORED, True, stats.st_mode)
+        member.header_offset = out.tell()
+        out.write(self._local_header(member))
+        self.members.append(member)
+
+    def write(self, source_dir, files, directories=None):
+        """Archive files below source_dir; directories defaults to every directory below it."""
+        source_dir = os.path.abspath(source_dir)
+        if directories is None:
+            directories = list_directories(source_dir)
+        states = []
+        window = (self.workers or os.cpu_count() or 1) * 4
+        with open(self.archive_path, 'wb') as out, ProcessPoolExecutor(max_workers=self.workers) as pool:
+            for directory in directories:
+                try:
+                    stats = os.stat(directory)
+                except OSError as e:
+                    logger.error("Failed to archive %s: %s", directory, e)
+                    continue
+                self._write_directory(out, os.path.relpath(directory, source_dir).replace(os.sep, '/'), stats)
+            pending = deque()
+            for job in self._jobs(source_dir, files, states):
+                pending.append(pool.submit(_compress_batch, job))
+                while len(pending) > window:
+                    for result in pending.popleft().result():
+                        self._write_piece(out, states, result)
+            while pending:
+                for result in pending.popleft().result():
+                    self._write_piece(out, states, result)
+            self._write_end(out)
+        return sum(not stat.S_ISDIR(member.mode) for member in self.members)
+
+
+# -- tar
+
+class _BlockSink(io.RawIOBase):
+    def __init__(self, submit, block_size):
+        self.submit = submit
+        self.block_size = block_size
+        self.buffer = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.buffer += data
+        while len(self.buffer) >= self.block_size:
+            self.submit(bytes(self.buffer[:self.block_size]))
+            del self.buffer[:self.block_size]
+        return len(data)
+
+    def flush_block(self):
+        if self.buffer:
+            self.submit(bytes(self.buffer))
+            self.buffer.clear()
+
+
+def list_directories(source_dir):
+    """Every directory below source_dir (not source_dir itself), parents first."""
+    directories = []
+    for root, subdirs, _ in os.walk(source_dir):
+        subdirs.sort()
+        directories.extend(os.path.join(root, subdir) for subdir in subdirs)
+    return directories
+
+
+def write_tar(archive_path, source_dir, files, fmt='tar.gz', level=6, workers=None, chunk_size=CHUNK_SIZE,
+              directories=None):
+    """Write a tarball compressed as independent blocks on a process pool.
+
+    Concatenated gzip members, xz streams and zstd frames are each valid
+    single files of their format, so every block compresses on its own.
+    """
+    if fmt == 'tar.zst' and zstandard is None:
+        raise ImportError("tar.zst archives require the 'zstandard' package")
+    source_dir = os.path.abspath(source_dir)
+    window = (workers or os.cpu_count() or 1) * 2
+    count = 0
+    with open(archive_path, 'wb') as out, ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+
+        def submit(block):
+            pending.append(pool.submit(_compress_block, fmt, level, block))
+            while len(pending) > window:
+                out.write(pending.popleft().result())
+
+        sink = _BlockSink(submit, chunk_size)
+        with tarfile.open(fileobj=sink, mode='w|', format=tarfile.PAX_FORMAT) as tar:
+            for directory in directories if directories is not None else list_directories(source_dir):
+                try:
+                    tar.add(directory, arcname=os.path.relpath(directory, source_dir), recursive=False)
+                except OSError as e:
+                    logger.error("Failed to archive %s: %s", directory, e)
+            for file in files:
+                entry = as_entry(file)
+                try:
+                    tar.add(entry.path, arcname=os.path.relpath(entry.path, source_dir), recursive=False)
+                except OSError as e:
+                    logger.error("Failed to archive %s: %s", entry.path, e)
+                    continue
+                count += 1
+        sink.flush_block()
+        while pending:
+            out.write(pending.popleft().result())
+    return count
+
+
+def write_archive(archive_path, source_dir, files, fmt=None, level=6, workers=None, chunk_size=CHUNK_SIZE,
+                  directories=None):
+    if fmt is None:
+        fmt = archive_format(archive_path) or 'zip'
+    if fmt not in ARCHIVE_FORMATS:
+        raise ValueError(f"Invalid archive format: {fmt}. Expected one of {', '.join(ARCHIVE_FORMATS)}")
+    if fmt == 'zip':
+        return ZipArchiveWriter(archive_path, level, workers, chunk_size).write(source_dir, files, directories)
+    return write_tar(archive_path, source_dir, files, fmt, level, workers, chunk_size, directories)
@@ -0,0 +1,207 @@
+import os
+import re
+import asyncio
+import logging
+import itertools
+
+from file_entry import FileEntry
+from copy_executor import ERRORS_KEY
+from file_index import is_index_file
+from file_organizer import FileOrganizer
+from organize_rules import RuleSet
+from organize_plan import create_directories, transfer_jobs, link_jobs
+from run_journal import RunJournal
+from transfer import transfer_file
+
+logger = logging.getLogger(__name__)
+
+
+def _scan_directory(directory):
+    entries = []
+    subdirs = []
+    try:
+        with os.scandir(directory) as it:
+            for entry in it:
+                try:
+                    if entry.is_file():
+                        if not is_index_file(entry.name):
+                            entries.append(FileEntry.from_dir_entry(entry))
+                    elif entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                except OSError as e:
+                    logger.warning("Skipping %s: %s", entry.path, e)
+    except OSError as e:
+        logger.warning("Unable to scan directory %s: %s", directory, e)
+    return entries, subdirs
+
+
+class AsyncFileOrganizer:
+    """asyncio front-end for FileOrganizer.
+
+    Directory listings and file transfers run on the default executor, one
+    directory or file per call, so results stream back as async iterators and
+    other coroutines keep running in between. max_concurrency bounds the number
+    of blocking calls in flight across every operation of this instance.
+    Cancelling the consuming task stops new work from being scheduled; calls
+    already handed to a thread run to completion.
+    """
+
+    def __init__(self, root_directory, max_concurrency=16, organizer=None, **organizer_options):
+        if organizer is None:
+            organizer = FileOrganizer(root_directory, **organizer_options)
+        self.organizer = organizer
+        self.root_directory = organizer.root_directory
+        self.max_concurrency = max_concurrency
+        self._semaphore = None
+
+    @property
+    def semaphore(self):
+        # Created lazily so the instance can be built outside a running loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def _run_blocking(self, function, *args):
+        async with self.semaphore:
+            return await asyncio.to_thread(function, *args)
+
+    async def scan_files(self, directory=None, recursive=False):
+        if directory is None:
+            directory = self.root_directory
+        else:
+            directory = os.path.abspath(directory)
+
+        pending = [directory]
+        while pending:
+            entries, subdirs = await self._run_blocking(_scan_directory, pending.pop())
+            for entry in entries:
+                yield entry
+            if recursive:
+                pending.extend(subdirs)
+
+    async def list_files(self, directory=None, recursive=False, with_stats=False):
+        return [entry if with_stats else entry.path async for entry in self.scan_files(directory, recursive)]
+
+    async def search_files(self, search_term, directory=None, recursive=True, case_sensitive=False):
+        flags = 0 if case_sensitive else re.IGNORECASE
+        pattern = re.compile(re.escape(search_term), flags)
+        async for entry in self.scan_files(directory, recursive=recursive):
+            if pattern.search(entry.name):
+                yield entry.path
+
+    async def _transfer(self, category, source, destination, mode, origin):
+        try:
+            await self._run_blocking(transfer_file, source, destination, mode)
+        except OSError as e:
+            logger.error("Failed to %s %s to %s: %s", mode, source, destination, e)
+            return category, origin, None, str(e)
+        logger.debug("Transferred %s to %s (%s)", source, destination, mode)
+        return category, origin, destination, None
+
+    async def _transfer_all(self, jobs):
+        # jobs yields (category, source, destination, mode, origin); origin is
+        # the file reported in the result, which differs for duplicate links
+        jobs = iter(jobs)
+        in_flight = set()
+        try:
+            while True:
+                for job in itertools.islice(jobs, self.max_concurrency - len(in_flight)):
+                    in_flight.add(asyncio.ensure_future(self._transfer(*job)))
+                if not in_flight:
+                    return
+                finished, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for task in finished:
+                    yield task.result()
+        finally:
+            for task in in_flight:
+                task.cancel()
+
+    async def _organize(self, source_dir, target_dir, categorize, files=None, journal=None, resume=False,
+                        progress=None, **plan_options):
+        """Plan like FileOrganizer (collisions, duplicates, resume), then stream the transfers.
+
+        plan_options are FileOrganizer._organize's transfer_mode, duplicates
+        and on_collision. Yields (category, source, destination, error) per
+        file, including the ones a resumed plan found already completed.
+        """
+        if source_dir is None:
+            source_dir = self.root_directory
+        if target_dir is None:
+            target_dir = self.root_directory
+
+        if files is not None:
+            entries = await self._run_blocking(lambda: [self.organizer._entry(file) for file in files])
+        else:
+            entries = [entry async for entry in self.scan_files(source_dir)]
+        plan = await self._run_blocking(
+            lambda: self.organizer._organize(entries, target_dir, categorize, dry_run=True, journal=journal,
+                                             resume=resume, **plan_options)
+        )
+        await self._run_blocking(create_directories, plan)
+
+        run_journal = None
+        if journal is not None:
+            run_journal = RunJournal(journal).open(truncate=not resume)
+        done = 0
+        failed = set()
+
+        def finish(result):
+            nonlocal done
+            category, source, destination, error = result
+            done += 1
+            if error is not None:
+                failed.add(source)
+            elif run_journal is not None:
+                run_journal.append(os.fspath(source), destination)
+            if progress is not None:
+                progress(done, result)
+            return result
+
+        try:
+            for completed in plan.completed:
+                yield finish((completed.category, completed.source, completed.destination, None))
+            async for result in self._transfer_all(job + (job[1],) for job in transfer_jobs(plan)):
+                yield finish(result)
+            links = ((*job, link.source) for link, job in zip(plan.links, link_jobs(plan, failed)))
+            async for result in self._transfer_all(links):
+                yield finish(result)
+        finally:
+            if run_journal is not None:
+                run_journal.close()
+            logger.info("Organized %d files into %s, %d errors", done - len(failed), target_dir, len(failed))
+
+    def organize_by_type(self, source_dir=None, target_dir=None, **options):
+        return self._organize(source_dir, target_dir, self.organizer.type_category, **options)
+
+    def organize_by_date(self, source_dir=None, target_dir=None, date_format='%Y-%m', **options):
+        return self._organize(
+            source_dir, target_dir, lambda entry: self.organizer.date_category(entry, date_format), **options
+        )
+
+    def organize_by_size(self, source_dir=None, target_dir=None, **options):
+        return self._organize(source_dir, target_dir, self.organizer.size_category, **options)
+
+    def organize_by_rules(self, source_dir=None, target_dir=None, rules=None, **options):
+        if not rules:
+            raise ValueError("organize_by_rules needs at least one rule")
+        rule_set = rules if isinstance(rules, RuleSet) else RuleSet(rules)
+        return self._organize(source_dir, target_dir, rule_set.destination, **options)
+
+    async def collect(self, results):
+        """Gather an organize_by_* stream into the {category: [destinations]} map FileOrganizer returns."""
+        grouped = {}
+        errors = []
+        async for category, source, destination, error in results:
+            if error is None:
+                grouped.setdefault(category, []).append(destination)
+            else:
+                errors.append((source, error))
+        if errors:
+            grouped[ERRORS_KEY] = errors
+        return grouped
+
+    async def create_backup(self, source_dir=None, backup_name=None, **options):
+        # The archive writers already fan out to a process pool; keep the loop free while they run
+        return await self._run_blocking(
+            lambda: self.organizer.create_backup(source_dir, backup_name, **options)
+        )
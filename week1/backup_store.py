@@ -0,0 +1,196 @@
+import os
+import json
+import zlib
+import hashlib
+import logging
+import datetime
+
+from file_entry import as_entry
+from run_journal import RunJournal
+
+logger = logging.getLogger(__name__)
+
+READ_CHUNK = 1024 * 1024
+
+
+class BackupStore:
+    """Content-addressed backup store with one JSON manifest per snapshot.
+
+    Layout:
+        objects/<aa>/<sha256>     zlib-compressed file contents
+        manifests/<snapshot>.json relative path -> [size, mtime, sha256]
+
+    A file whose size and mtime match the previous snapshot reuses its hash
+    without being read; changed files are hashed and compressed in one pass
+    and only stored when their content is not already in the store.
+
+    Every stored file is also recorded in manifests/.in_progress.journal until
+    the snapshot's manifest is written, so a backup that is interrupted and
+    run again does not re-read the files it had already stored.
+    """
+
+    def __init__(self, store_dir, level=6):
+        self.store_dir = os.path.abspath(store_dir)
+        self.objects_dir = os.path.join(self.store_dir, 'objects')
+        self.manifests_dir = os.path.join(self.store_dir, 'manifests')
+        self.level = level
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.manifests_dir, exist_ok=True)
+
+    def snapshots(self):
+        return sorted(
+            os.path.splitext(name)[0]
+            for name in os.listdir(self.manifests_dir)
+            if name.endswith('.json')
+        )
+
+    @property
+    def journal_path(self):
+        return os.path.join(self.manifests_dir, '.in_progress.journal')
+
+    def manifest_path(self, snapshot):
+        return os.path.join(self.manifests_dir, f"{snapshot}.json")
+
+    def load_manifest(self, snapshot=None):
+        if snapshot is None:
+            snapshots = self.snapshots()
+            if not snapshots:
+                return None
+            snapshot = snapshots[-1]
+        with open(self.manifest_path(snapshot), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def object_path(self, digest):
+        return os.path.join(self.objects_dir, digest[:2], digest)
+
+    def _store_file(self, path):
+        digest = hashlib.sha256()
+        compressor = zlib.compressobj(self.level)
+        tmp_path = os.path.join(self.objects_dir, f".incoming.{os.getpid()}")
+        with open(path, 'rb') as src, open(tmp_path, 'wb') as out:
+            for chunk in iter(lambda: src.read(READ_CHUNK), b''):
+                digest.update(chunk)
+                out.write(compressor.compress(chunk))
+            out.write(compressor.flush())
+
+        digest = digest.hexdigest()
+        object_path = self.object_path(digest)
+        if os.path.exists(object_path):
+            os.unlink(tmp_path)
+            return digest, 0
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+        stored = os.path.getsize(tmp_path)
+        os.replace(tmp_path, object_path)
+        return digest, stored
+
+    def backup(self, source_dir, files, snapshot=None, progress=None, resume=True):
+        """Store a snapshot of files; progress(done_files, total_files, done_bytes, total_bytes) is called per file.
+
+        With resume=False an interrupted backup's journal is discarded and
+        every changed file is read again.
+        """
+        source_dir = os.path.abspath(source_dir)
+        if snapshot is None:
+            snapshot = datetime.datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        previous = self.load_manifest()
+        previous_files = previous['files'] if previous else {}
+        interrupted = {
+            rel_path: [size, mtime, digest]
+            for rel_path, size, mtime, digest in RunJournal.read(self.journal_path)
+        } if resume else {}
+        if interrupted:
+            logger.info("Resuming an interrupted backup with %d files already stored", len(interrupted))
+
+        entries = []
+        for file in files:
+            entry = as_entry(file)
+            if entry.path == self.store_dir or entry.path.startswith(self.store_dir + os.sep):
+                continue
+            entries.append(entry)
+        total_bytes = sum(entry.size for entry in entries)
+
+        manifest_files = {}
+        stats = {'files': 0, 'unchanged': 0, 'resumed': 0, 'new_objects': 0, 'stored_bytes': 0}
+        done_bytes = 0
+        with RunJournal(self.journal_path).open(truncate=not resume) as journal:
+            for entry in entries:
+                rel_path = os.path.relpath(entry.path, source_dir)
+                stats['files'] += 1
+                done_bytes += entry.size
+
+                known = previous_files.get(rel_path)
+                if known is not None and known[0] == entry.size and known[1] == entry.mtime:
+                    manifest_files[rel_path] = known
+                    stats['unchanged'] += 1
+                else:
+                    known = interrupted.get(rel_path)
+                    if (known is not None and known[0] == entry.size and known[1] == entry.mtime
+                            and os.path.exists(self.object_path(known[2]))):
+                        manifest_files[rel_path] = known
+                        stats['resumed'] += 1
+                    else:
+                        try:
+                            digest, stored = self._store_file(entry.path)
+                        except OSError as e:
+                            logger.error("Failed to back up %s: %s", entry.path, e)
+                            continue
+                        if stored:
+                            stats['new_objects'] += 1
+                            stats['stored_bytes'] += stored
+                        manifest_files[rel_path] = [entry.size, entry.mtime, digest]
+                        journal.append(rel_path, entry.size, entry.mtime, digest)
+
+                if progress is not None:
+                    progress(stats['files'], len(entries), done_bytes, total_bytes)
+
+        manifest = {
+            'snapshot': snapshot,
+            'created': datetime.datetime.now().isoformat(),
+            'source': source_dir,
+            'files': manifest_files,
+        }
+        manifest_path = self.manifest_path(snapshot)
+        with open(manifest_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        os.replace(manifest_path + '.tmp', manifest_path)
+        RunJournal(self.journal_path).remove()
+
+        logger.info(
+            "Snapshot %s: %d files, %d unchanged, %d resumed, %d new objects (%d bytes)",
+            snapshot, stats['files'], stats['unchanged'], stats['resumed'], stats['new_objects'],
+            stats['stored_bytes']
+        )
+        return manifest_path, stats
+
+    def restore(self, target_dir, snapshot=None):
+        manifest = self.load_manifest(snapshot)
+        if manifest is None:
+            raise FileNotFoundError(f"No snapshots in backup store {self.store_dir}")
+
+        target_dir = os.path.abspath(target_dir)
+        restored = []
+        for rel_path, (size, mtime, digest) in manifest['files'].items():
+            dest = os.path.join(target_dir, rel_path)
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            decompressor = zlib.decompressobj()
+            with open(self.object_path(digest), 'rb') as src, open(dest, 'wb') as out:
+                for chunk in iter(lambda: src.read(READ_CHUNK), b''):
+                    out.write(decompressor.decompress(chunk))
+                out.write(decompressor.flush())
+            os.utime(dest, (mtime, mtime))
+            restored.append(dest)
+
+        logger.info("Restored snapshot %s (%s files) to %s", manifest['snapshot'], len(restored), target_dir)
+        return restored
+
+    def prune_objects(self):
+        referenced = set()
+        for snapshot in self.snapshots():
+            referenced.update(item[2] for item in self.load_manifest(snapshot)['files'].values())
+        removed = 0
+        for root, _, names in os.walk(self.objects_dir):
+            for name in names:
+                if name not in referenced:
+                    os.unlink(os.path.join(root, name))
+                    removed += 1
+        return removed
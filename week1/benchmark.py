@@ -0,0 +1,324 @@
+import os
+import sys
+import json
+import time
+import queue
+import shutil
+import logging
+import argparse
+import resource
+import tempfile
+import traceback
+import statistics
+import importlib.util
+import multiprocessing
+
+from synthetic_tree import SyntheticTree, generate_csv, generate_json
+from transfer import TRANSFER_MODES
+
+logger = logging.getLogger(__name__)
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    def register(function):
+        BENCHMARKS[name] = function
+        return function
+    return register
+
+
+def _load_tasks():
+    # task1-2.py is not an importable module name
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'task1-2.py')
+    spec = importlib.util.spec_from_file_location('task1_2', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _organizer(context):
+    from file_organizer import FileOrganizer
+    return FileOrganizer(context['tree'], scan_workers=context['scan_workers'])
+
+
+def _scratch(context, name):
+    path = os.path.join(context['scratch'], name)
+    shutil.rmtree(path, ignore_errors=True)
+    return path
+
+
+# Each benchmark takes the context dict and returns (files, bytes) processed.
+
+@benchmark('list_files')
+def bench_list_files(context):
+    entries = _organizer(context).list_files(recursive=True, with_stats=True)
+    return len(entries), sum(entry.size for entry in entries)
+
+
+@benchmark('sort_files')
+def bench_sort_files(context):
+    organizer = _organizer(context)
+    entries = organizer.list_files(recursive=True, with_stats=True)
+    for sort_by in ('name', 'type', 'date', 'size'):
+        organizer.sort_files(entries, sort_by=sort_by)
+    organizer.sort_files(entries, sort_by='size', reverse=True, limit=100)
+    return len(entries) * 5, 0
+
+
+@benchmark('search_files')
+def bench_search_files(context):
+    organizer = _organizer(context)
+    terms = ('file00', '.txt', 'dir1', '7')
+    for term in terms:
+        organizer.search_files(term)
+    return context['files'] * len(terms), 0
+
+
+def _organize(context, method, **options):
+    organizer = _organizer(context)
+    target = _scratch(context, method)
+    results = getattr(organizer, method)(context['tree'], target,
+                                         files=organizer.list_files(recursive=True, with_stats=True), **options)
+    shutil.rmtree(target, ignore_errors=True)
+    return sum(len(paths) for paths in results.values()), context['bytes']
+
+
+@benchmark('organize_by_type')
+def bench_organize_by_type(context):
+    return _organize(context, 'organize_by_type', transfer_mode=context['transfer_mode'])
+
+
+@benchmark('organize_by_date')
+def bench_organize_by_date(context):
+    return _organize(context, 'organize_by_date', transfer_mode=context['transfer_mode'])
+
+
+@benchmark('organize_by_size')
+def bench_organize_by_size(context):
+    return _organize(context, 'organize_by_size', transfer_mode=context['transfer_mode'])
+
+
+@benchmark('create_backup')
+def bench_create_backup(context):
+    organizer = _organizer(context)
+    path = organizer.create_backup(context['tree'], os.path.join(context['scratch'], 'backup.zip'))
+    os.unlink(path)
+    return context['files'], context['bytes']
+
+
+@benchmark('parse_csv')
+def bench_parse_csv(context):
+    rows = _load_tasks().parse_csv(context['csv'])
+    return len(rows), os.path.getsize(context['csv'])
+
+
+@benchmark('process_json')
+def bench_process_json(context):
+    records = _load_tasks().process_json(context['json'])
+    return len(records), os.path.getsize(context['json'])
+
+
+def _io_counters():
+    counters = {}
+    try:
+        with open('/proc/self/io') as f:
+            for line in f:
+                key, value = line.split(':')
+                counters[key] = int(value)
+    except OSError:
+        pass
+    return counters
+
+
+def _run(name, context, repeat):
+    """Run one benchmark in this (fresh) process and return its measurements."""
+    function = BENCHMARKS[name]
+    timings = []
+    calls = {'read': 0, 'write': 0}
+    # read()/write()-family calls of this process only (syscr/syscw in the
+    # Linux-only /proc/self/io): stat calls and pool children are not counted,
+    # and the fields are None elsewhere
+    counted = bool(_io_counters())
+    for _ in range(repeat):
+        before = _io_counters()
+        started = time.perf_counter()
+        files, size = function(context)
+        timings.append(time.perf_counter() - started)
+        after = _io_counters()
+        if counted:
+            calls['read'] += after['syscr'] - before['syscr']
+            calls['write'] += after['syscw'] - before['syscw']
+
+    best = min(timings)
+    # ru_maxrss is in KiB on Linux; children covers process pools
+    peak_rss = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                   resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss) * 1024
+    return {
+        'seconds': best,
+        'median_seconds': statistics.median(timings),
+        'files': files,
+        'bytes': size,
+        'files_per_second': files / best if best else None,
+        'bytes_per_second': size / best if best and size else None,
+        'read_calls': calls['read'] // repeat if counted else None,
+        'write_calls': calls['write'] // repeat if counted else None,
+        'peak_rss': peak_rss,
+    }
+
+
+def _child(name, context, repeat, results):
+    try:
+        results.put(_run(name, context, repeat))
+    except Exception:
+        results.put({'error': traceback.format_exc()})
+
+
+def _collect(process, results):
+    # A child killed before reporting (e.g. by the OOM killer) never puts a result
+    while True:
+        try:
+            return results.get(timeout=1)
+        except queue.Empty:
+            if not process.is_alive():
+                return {'error': f"benchmark process exited with code {process.exitcode} without a result"}
+
+
+def run_benchmarks(context, names=None, repeat=3):
+    """Run benchmarks, each in its own spawned process so peak RSS and I/O counters are its own.
+
+    Returns (results, failures): failures maps the names of benchmarks that
+    raised or died to the error text.
+    """
+    spawn = multiprocessing.get_context('spawn')
+    results = {}
+    failures = {}
+    for name in names or BENCHMARKS:
+        result_queue = spawn.Queue()
+        process = spawn.Process(target=_child, args=(name, context, repeat, result_queue))
+        process.start()
+        result = _collect(process, result_queue)
+        process.join()
+        if 'error' in result:
+            failures[name] = result['error']
+            logger.error("%s failed: %s", name, result['error'])
+            continue
+        results[name] = result
+        logger.info("%s: %.3fs", name, result['seconds'])
+    return results, failures
+
+
+def compare(results, baseline, tolerance=0.2):
+    """Return (name, seconds, baseline_seconds, ratio) for every benchmark slower than baseline by > tolerance."""
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get('results', {}).get(name)
+        if previous is None or not previous['seconds']:
+            continue
+        ratio = result['seconds'] / previous['seconds']
+        if ratio > 1 + tolerance:
+            regressions.append((name, result['seconds'], previous['seconds'], ratio))
+    return regressions
+
+
+def prepare(workdir, files, depth, fan_out, duplicate_ratio, seed, rows):
+    tree = SyntheticTree(files=files, depth=depth, fan_out=fan_out, duplicate_ratio=duplicate_ratio, seed=seed)
+    summary = tree.generate(os.path.join(workdir, 'tree'))
+    scratch = os.path.join(workdir, 'scratch')
+    os.makedirs(scratch)
+    return {
+        'tree': summary['root'],
+        'files': summary['files'],
+        'bytes': summary['bytes'],
+        'scratch': scratch,
+        'csv': generate_csv(os.path.join(scratch, 'data.csv'), rows, seed),
+        'json': generate_json(os.path.join(scratch, 'data.json'), rows, seed),
+    }
+
+
+def _print_results(results, baseline):
+    previous = baseline.get('results', {}) if baseline else {}
+    print(f"{'benchmark':<18}{'seconds':>10}{'files/s':>12}{'MB/s':>10}{'read calls':>12}{'write calls':>13}"
+          f"{'peak MB':>10}{'vs base':>9}")
+    for name, result in results.items():
+        rate = result['bytes_per_second']
+        change = ''
+        if name in previous and previous[name]['seconds']:
+            change = f"{result['seconds'] / previous[name]['seconds']:.2f}x"
+        print(f"{name:<18}{result['seconds']:>10.3f}{result['files_per_second'] or 0:>12.0f}"
+              f"{(rate or 0) / 1e6:>10.1f}{result['read_calls'] or 0:>12}{result['write_calls'] or 0:>13}"
+              f"{result['peak_rss'] / 1e6:>10.1f}{change:>9}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the file organizer on a seeded synthetic tree.")
+    parser.add_argument('--files', type=int, default=10000)
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--fan-out', type=int, default=8)
+    parser.add_argument('--duplicate-ratio', type=float, default=0.05)
+    parser.add_argument('--rows', type=int, default=100000, help="rows in the generated CSV/JSON files")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--scan-workers', type=int, default=1)
+    parser.add_argument('--transfer-mode', choices=TRANSFER_MODES, default='copy')
+    parser.add_argument('--only', help="comma-separated benchmarks to run: " + ', '.join(BENCHMARKS))
+    parser.add_argument('--workdir', help="directory for the tree and scratch files (default: a temp dir)")
+    parser.add_argument('--baseline', help="baseline JSON file to compare against")
+    parser.add_argument('--save-baseline', action='store_true', help="write these results to --baseline")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="allowed slowdown before failing (0.2 = 20%%)")
+    parser.add_argument('--output', help="write results as JSON")
+    args = parser.parse_args(argv)
+
+    names = args.only.split(',') if args.only else list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(unknown)}")
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='organizer-bench-')
+    try:
+        context = prepare(workdir, args.files, args.depth, args.fan_out, args.duplicate_ratio, args.seed, args.rows)
+        context.update(scan_workers=args.scan_workers, transfer_mode=args.transfer_mode)
+        results, failures = run_benchmarks(context, names, args.repeat)
+    finally:
+        if args.workdir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    parameters = {key: value for key, value in vars(args).items()
+                  if key in ('files', 'depth', 'fan_out', 'duplicate_ratio', 'rows', 'seed', 'scan_workers',
+                             'transfer_mode')}
+    report = {'parameters': parameters, 'python': sys.version.split()[0], 'results': results, 'failures': failures}
+
+    baseline = None
+    if args.baseline and os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('parameters') != parameters:
+            print("warning: baseline was recorded with different parameters", file=sys.stderr)
+
+    _print_results(results, baseline)
+    for name, error in failures.items():
+        print(f"FAILED {name}:\n{error}", file=sys.stderr)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        if not args.baseline:
+            parser.error("--save-baseline needs --baseline")
+        if failures:
+            print("not saving a baseline with failed benchmarks", file=sys.stderr)
+            return 1
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        return 0
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.tolerance)
+        for name, seconds, previous, ratio in regressions:
+            print(f"REGRESSION {name}: {seconds:.3f}s vs {previous:.3f}s baseline ({ratio:.2f}x)", file=sys.stderr)
+        return 1 if regressions or failures else 0
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,128 @@
+import os
+import re
+import mmap
+import logging
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+SNIFF_BYTES = 8192
+FILES_PER_TASK = 32
+
+ContentMatch = namedtuple('ContentMatch', ['path', 'line_number', 'offset', 'line'])
+
+_compiled = {}
+
+
+def is_binary(sample):
+    return b'\0' in sample
+
+
+def _compile(pattern, regex, ignore_case):
+    key = (pattern, regex, ignore_case)
+    compiled = _compiled.get(key)
+    if compiled is None:
+        source = pattern if regex else re.escape(pattern)
+        compiled = re.compile(source, re.IGNORECASE if ignore_case else 0)
+        _compiled[key] = compiled
+    return compiled
+
+
+def _find(mapped, needle, compiled, start, limit):
+    if compiled is None:
+        position = mapped.find(needle, start, limit)
+        return (position, position + len(needle)) if position >= 0 else None
+    found = compiled.search(mapped, start, limit)
+    return found.span() if found else None
+
+
+def grep_file(path, pattern, regex=False, ignore_case=False, max_matches=1, max_bytes=None):
+    """Return the matches of a bytes pattern in one file, or None for binary files."""
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return []
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if is_binary(mapped[:SNIFF_BYTES]):
+                return None
+            limit = size if max_bytes is None else min(size, max_bytes)
+            # A plain bytes.find is much cheaper than the regex engine for literals
+            compiled = _compile(pattern, regex, ignore_case) if regex or ignore_case else None
+
+            matches = []
+            start = 0
+            line_number = 1
+            counted_to = 0
+            while start < limit and (max_matches is None or len(matches) < max_matches):
+                span = _find(mapped, pattern, compiled, start, limit)
+                if span is None:
+                    break
+                position, end = span
+                line_start = mapped.rfind(b'\n', 0, position) + 1
+                line_end = mapped.find(b'\n', position, limit)
+                if line_end < 0:
+                    line_end = limit
+                line_number += mapped[counted_to:line_start].count(b'\n')
+                counted_to = line_start
+                line = mapped[line_start:line_end].decode('utf-8', errors='replace').rstrip('\r')
+                matches.append(ContentMatch(path, line_number, position, line))
+                start = max(end, line_end + 1)
+            return matches
+
+
+def _grep_batch(paths, pattern, regex, ignore_case, max_matches, max_bytes):
+    results = []
+    for path in paths:
+        try:
+            results.append((path, grep_file(path, pattern, regex, ignore_case, max_matches, max_bytes), None))
+        except (OSError, ValueError) as e:
+            results.append((path, None, str(e)))
+    return results
+
+
+def grep_files(paths, pattern, regex=False, ignore_case=False, max_matches=1, max_bytes=None, workers=None):
+    """Search the contents of many files on a process pool, yielding matches as batches finish.
+
+    pattern is a str or bytes; str patterns are encoded as UTF-8. At most
+    max_matches lines are reported per file (None for all of them) and at most
+    max_bytes bytes of each file are searched.
+    """
+    if isinstance(pattern, str):
+        pattern = pattern.encode('utf-8')
+    options = (pattern, regex, ignore_case, max_matches, max_bytes)
+
+    def batches():
+        batch = []
+        for path in paths:
+            batch.append(os.fspath(path))
+            if len(batch) >= FILES_PER_TASK:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def report(results):
+        for path, matches, error in results:
+            if error is not None:
+                logger.warning("Unable to search %s: %s", path, error)
+            elif matches:
+                yield from matches
+
+    if workers == 1:
+        for batch in batches():
+            yield from report(_grep_batch(batch, *options))
+        return
+
+    window = (workers or os.cpu_count() or 1) * 2
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for batch in batches():
+            pending.append(pool.submit(_grep_batch, batch, *options))
+            while len(pending) >= window:
+                yield from report(pending.popleft().result())
+            # Stream batches that are already done, keeping output in submission order
+            while pending and pending[0].done():
+                yield from report(pending.popleft().result())
+        while pending:
+            yield from report(pending.popleft().result())
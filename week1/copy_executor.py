@@ -0,0 +1,79 @@
+import time
+import logging
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import metrics
+from transfer import transfer_file
+
+logger = logging.getLogger(__name__)
+
+ERRORS_KEY = '_errors'
+
+
+class CopyExecutor:
+    """Executes (key, source, destination, mode) transfer jobs and groups the results by key.
+
+    With max_workers > 1 the copies run on a thread pool; at most max_in_flight
+    jobs are pulled from the job iterable at a time, so a lazily generated job
+    stream never has to be materialized. on_done, if given, is called on the
+    calling thread as on_done(key, source, destination, error) after each job.
+    """
+
+    def __init__(self, max_workers=1, max_in_flight=None, copy_function=transfer_file):
+        self.max_workers = max(1, max_workers)
+        self.max_in_flight = max_in_flight or self.max_workers * 4
+        self.copy_function = copy_function
+
+    def _copy(self, seq, key, src, dst, mode):
+        registry = metrics.active()
+        try:
+            if registry is None:
+                self.copy_function(src, dst, mode)
+            else:
+                started = time.perf_counter()
+                self.copy_function(src, dst, mode)
+                registry.observe('copy_seconds', time.perf_counter() - started)
+        except OSError as e:
+            metrics.count('copy_errors')
+            logger.error("Failed to %s %s to %s: %s", mode, src, dst, e)
+            return seq, key, None, (str(src), str(e))
+        logger.debug("Transferred %s to %s (%s)", src, dst, mode)
+        return seq, key, dst, None
+
+    def run(self, jobs, on_done=None):
+        done = []
+        sources = {}
+
+        def finish(result):
+            done.append(result)
+            if on_done is not None:
+                seq, key, dst, error = result
+                on_done(key, sources.pop(seq), dst, error)
+
+        if self.max_workers == 1:
+            for seq, job in enumerate(jobs):
+                sources[seq] = job[1]
+                finish(self._copy(seq, *job))
+        else:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                in_flight = set()
+                for seq, job in enumerate(jobs):
+                    if len(in_flight) >= self.max_in_flight:
+                        finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                        for future in finished:
+                            finish(future.result())
+                    sources[seq] = job[1]
+                    in_flight.add(pool.submit(self._copy, seq, *job))
+                for future in in_flight:
+                    finish(future.result())
+
+        results = defaultdict(list)
+        errors = []
+        # Report in submission order regardless of which worker finished first
+        for _, key, dst, error in sorted(done, key=lambda item: item[0]):
+            if error is None:
+                results[key].append(dst)
+            else:
+                errors.append(error)
+        return dict(results), errors
@@ -0,0 +1,103 @@
+import os
+import mmap
+import hashlib
+import logging
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from file_entry import as_entry
+
+logger = logging.getLogger(__name__)
+
+PARTIAL_BLOCK = 64 * 1024
+HASH_CHUNK = 1024 * 1024
+
+
+def partial_hash(path, size):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        digest.update(f.read(PARTIAL_BLOCK))
+        if size > 2 * PARTIAL_BLOCK:
+            f.seek(size - PARTIAL_BLOCK)
+        digest.update(f.read(PARTIAL_BLOCK))
+    return digest.hexdigest()
+
+
+def full_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return digest.hexdigest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                for offset in range(0, len(view), HASH_CHUNK):
+                    digest.update(view[offset:offset + HASH_CHUNK])
+            finally:
+                view.release()
+    return digest.hexdigest()
+
+
+def _try_partial_hash(path, size):
+    try:
+        return partial_hash(path, size)
+    except OSError as e:
+        logger.warning("Unable to hash %s: %s", path, e)
+        return None
+
+
+def _try_full_hash(path, size):
+    try:
+        return full_hash(path)
+    except OSError as e:
+        logger.warning("Unable to hash %s: %s", path, e)
+        return None
+
+
+def _hash_groups(groups, hash_function, pool_factory, workers):
+    entries = [entry for group in groups for entry in group]
+    paths = [entry.path for entry in entries]
+    sizes = [entry.size for entry in entries]
+    if workers == 1 or len(entries) < 2:
+        digests = list(map(hash_function, paths, sizes))
+    else:
+        with pool_factory(max_workers=workers) as pool:
+            digests = list(pool.map(hash_function, paths, sizes, chunksize=16))
+
+    regrouped = []
+    position = 0
+    for group in groups:
+        by_digest = defaultdict(list)
+        for entry in group:
+            digest = digests[position]
+            position += 1
+            if digest is not None:
+                by_digest[digest].append(entry)
+        regrouped.extend(same for same in by_digest.values() if len(same) > 1)
+    return regrouped
+
+
+def find_duplicates(files, workers=None):
+    """Group files with identical content.
+
+    Files are bucketed by size first, then by a hash of their first and last
+    PARTIAL_BLOCK bytes; only files larger than two blocks that still collide
+    are read in full, on a process pool.
+    """
+    by_size = defaultdict(list)
+    for file in files:
+        entry = as_entry(file)
+        by_size[entry.size].append(entry)
+    groups = [group for group in by_size.values() if len(group) > 1]
+
+    small = [group for group in groups if group[0].size <= 2 * PARTIAL_BLOCK]
+    large = [group for group in groups if group[0].size > 2 * PARTIAL_BLOCK]
+    # For small files the partial hash already covers every byte
+    small = _hash_groups(small, _try_partial_hash, ThreadPoolExecutor, workers or 8)
+    large = _hash_groups(large, _try_partial_hash, ThreadPoolExecutor, workers or 8)
+    large = _hash_groups(large, _try_full_hash, ProcessPoolExecutor, workers)
+
+    duplicates = [sorted(group, key=lambda entry: entry.path) for group in small + large]
+    duplicates.sort(key=lambda group: group[0].path)
+    logger.info("Found %s groups of duplicate files", len(duplicates))
+    return duplicates
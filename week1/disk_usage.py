@@ -0,0 +1,210 @@
+import os
+import sys
+import csv
+import json
+import heapq
+import logging
+import argparse
+import datetime
+
+from organize_rules import size_bucket
+from file_table import date_slot_seconds
+
+logger = logging.getLogger(__name__)
+
+SECTIONS = ('by_extension', 'by_size', 'by_date', 'by_directory')
+
+
+class UsageAggregator:
+    """Streaming disk-usage totals over FileEntry objects; only stat data is used.
+
+    Totals are kept per extension (as type_category names them), size bucket,
+    date bucket and directory; directory totals are rolled up into their
+    ancestors when the report is built, so each file is touched exactly once.
+    """
+
+    def __init__(self, root, top=10, date_format='%Y-%m', time_column='mtime'):
+        self.root = os.path.abspath(root)
+        self.top = top
+        self.date_format = date_format
+        self.time_column = time_column
+        self.files = 0
+        self.bytes = 0
+        self.by_extension = {}
+        self.by_size = {}
+        self.by_date = {}
+        self.by_directory = {}
+        self.largest_files = []
+        self._slot_seconds = date_slot_seconds(date_format)
+        self._slot_labels = {}
+
+    @staticmethod
+    def _count(totals, key, size):
+        counter = totals.get(key)
+        if counter is None:
+            totals[key] = [1, size]
+        else:
+            counter[0] += 1
+            counter[1] += size
+
+    def _date_label(self, timestamp):
+        slot = int(timestamp // self._slot_seconds)
+        label = self._slot_labels.get(slot)
+        if label is None:
+            label = datetime.datetime.fromtimestamp(slot * self._slot_seconds).strftime(self.date_format)
+            self._slot_labels[slot] = label
+        return label
+
+    def add(self, entry):
+        size = entry.size
+        self.files += 1
+        self.bytes += size
+        extension = os.path.splitext(entry.name)[1].lower()
+        self._count(self.by_extension, extension[1:] if extension else 'no_extension', size)
+        self._count(self.by_size, size_bucket(size), size)
+        self._count(self.by_date, self._date_label(getattr(entry, self.time_column)), size)
+        self._count(self.by_directory, os.path.dirname(entry.path), size)
+
+        if self.top:
+            item = (size, entry.path)
+            if len(self.largest_files) < self.top:
+                heapq.heappush(self.largest_files, item)
+            elif item > self.largest_files[0]:
+                heapq.heapreplace(self.largest_files, item)
+
+    def update(self, entries):
+        for entry in entries:
+            self.add(entry)
+        return self
+
+    def subtree_totals(self):
+        totals = {}
+        for directory, (files, size) in self.by_directory.items():
+            while True:
+                counter = totals.setdefault(directory, [0, 0])
+                counter[0] += files
+                counter[1] += size
+                if directory == self.root:
+                    break
+                parent = os.path.dirname(directory)
+                if parent == directory or not directory.startswith(self.root):
+                    break
+                directory = parent
+        return totals
+
+    def report(self, max_depth=None):
+        """Build the report dict; by_directory lists subtrees down to max_depth levels below the root."""
+        def section(totals):
+            return {
+                key: {'files': files, 'bytes': size}
+                for key, (files, size) in sorted(totals.items(), key=lambda item: -item[1][1])
+            }
+
+        subtrees = {}
+        for directory, counter in self.subtree_totals().items():
+            relative = os.path.relpath(directory, self.root)
+            depth = 0 if relative == os.curdir else relative.count(os.sep) + 1
+            if max_depth is None or depth <= max_depth:
+                subtrees[relative] = counter
+
+        directories = [(size, path) for path, (_, size) in subtrees.items() if path != os.curdir]
+        return {
+            'root': self.root,
+            'generated': datetime.datetime.now().isoformat(),
+            'files': self.files,
+            'bytes': self.bytes,
+            'by_extension': section(self.by_extension),
+            'by_size': section(self.by_size),
+            'by_date': section(self.by_date),
+            'by_directory': section(subtrees),
+            'largest_files': [
+                {'path': path, 'bytes': size} for size, path in sorted(self.largest_files, reverse=True)
+            ],
+            'largest_directories': [
+                {'path': path, 'bytes': size} for size, path in heapq.nlargest(self.top, directories)
+            ],
+        }
+
+
+def write_json(report, f):
+    json.dump(report, f, indent=2)
+    f.write('\n')
+
+
+def write_csv(report, f):
+    writer = csv.writer(f)
+    writer.writerow(['section', 'key', 'files', 'bytes'])
+    for name in SECTIONS:
+        for key, totals in report[name].items():
+            writer.writerow([name, key, totals['files'], totals['bytes']])
+    for name in ('largest_files', 'largest_directories'):
+        for item in report[name]:
+            writer.writerow([name, item['path'], '', item['bytes']])
+
+
+def format_size(size):
+    for unit in ('B', 'KB', 'MB', 'GB', 'TB'):
+        if size < 1024 or unit == 'TB':
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def format_report(report, limit=10):
+    lines = [f"{report['root']}: {report['files']} files, {format_size(report['bytes'])}"]
+    for name in SECTIONS:
+        lines.append('')
+        lines.append(name.replace('_', ' ').capitalize() + ':')
+        for key, totals in list(report[name].items())[:limit]:
+            lines.append(f"  {format_size(totals['bytes']):>10}  {totals['files']:>8} files  {key}")
+    for name in ('largest_files', 'largest_directories'):
+        lines.append('')
+        lines.append(name.replace('_', ' ').capitalize() + ':')
+        for item in report[name]:
+            lines.append(f"  {format_size(item['bytes']):>10}  {item['path']}")
+    return '\n'.join(lines)
+
+
+def _open_output(path):
+    return sys.stdout if path == '-' else open(path, 'w', encoding='utf-8', newline='')
+
+
+def main(argv=None):
+    # Imported here: file_organizer itself imports this module for FileOrganizer.disk_usage
+    from file_organizer import FileOrganizer
+
+    parser = argparse.ArgumentParser(description="Report what is using disk space below a directory. "
+                                                 "Only file metadata is read; nothing is modified.")
+    parser.add_argument('directory')
+    parser.add_argument('--top', type=int, default=10, help="number of largest files and directories to list")
+    parser.add_argument('--date-format', default='%Y-%m', help="strftime format of the date buckets")
+    parser.add_argument('--time', choices=('mtime', 'ctime', 'atime'), default='mtime',
+                        help="timestamp the date buckets use")
+    parser.add_argument('--depth', type=int, default=None, help="deepest directory level to report")
+    parser.add_argument('--workers', type=int, default=1, help="threads used to walk the tree")
+    parser.add_argument('--json', metavar='PATH', help="write the report as JSON ('-' for stdout)")
+    parser.add_argument('--csv', metavar='PATH', help="write the report as CSV ('-' for stdout)")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.directory):
+        parser.error(f"not a directory: {args.directory}")
+
+    organizer = FileOrganizer(args.directory, scan_workers=args.workers)
+    report = organizer.disk_usage(top=args.top, date_format=args.date_format, time_column=args.time,
+                                  max_depth=args.depth)
+
+    for path, writer in ((args.json, write_json), (args.csv, write_csv)):
+        if path is None:
+            continue
+        f = _open_output(path)
+        try:
+            writer(report, f)
+        finally:
+            if f is not sys.stdout:
+                f.close()
+    if args.json is None and args.csv is None:
+        print(format_report(report))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
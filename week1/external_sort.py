@@ -0,0 +1,49 @@
+import heapq
+import pickle
+import logging
+import tempfile
+from itertools import islice
+
+logger = logging.getLogger(__name__)
+
+
+def _write_run(items):
+    run = tempfile.TemporaryFile()
+    for item in items:
+        pickle.dump(item, run, protocol=pickle.HIGHEST_PROTOCOL)
+    run.seek(0)
+    return run
+
+
+def _read_run(run):
+    while True:
+        try:
+            yield pickle.load(run)
+        except EOFError:
+            return
+
+
+def external_sort(items, key=None, reverse=False, run_size=100_000):
+    """Sort an iterable of any size, yielding items in order.
+
+    Items are read run_size at a time, each run is sorted in memory and
+    pickled to an anonymous temporary file, and the runs are streamed back
+    through heapq.merge, so memory use is bounded by one run plus one item
+    per run. Input that fits in a single run is never written to disk.
+    """
+    iterator = iter(items)
+    runs = []
+    try:
+        while True:
+            chunk = sorted(islice(iterator, run_size), key=key, reverse=reverse)
+            if not chunk:
+                break
+            if not runs and len(chunk) < run_size:
+                yield from chunk
+                return
+            runs.append(_write_run(chunk))
+        logger.debug("Merging %d sorted runs of up to %d items", len(runs), run_size)
+        yield from heapq.merge(*(_read_run(run) for run in runs), key=key, reverse=reverse)
+    finally:
+        for run in runs:
+            run.close()
@@ -0,0 +1,58 @@
+import os
+
+
+class FileEntry:
+    __slots__ = ('path', 'name', 'size', 'mtime', 'ctime', 'atime', 'inode', 'dev')
+
+    def __init__(self, path, name, size, mtime, ctime, atime, inode=0, dev=0):
+        self.path = path
+        self.name = name
+        self.size = size
+        self.mtime = mtime
+        self.ctime = ctime
+        self.atime = atime
+        self.inode = inode
+        self.dev = dev
+
+    @classmethod
+    def from_stat(cls, path, stats, name=None):
+        if name is None:
+            name = os.path.basename(path)
+        return cls(path, name, stats.st_size, stats.st_mtime, stats.st_ctime,
+                   stats.st_atime, stats.st_ino, stats.st_dev)
+
+    @classmethod
+    def from_dir_entry(cls, entry):
+        # DirEntry caches its stat result, so this is the only stat call for the file
+        return cls.from_stat(entry.path, entry.stat(), entry.name)
+
+    @classmethod
+    def from_path(cls, path):
+        return cls.from_stat(path, os.stat(path))
+
+    @property
+    def extension(self):
+        return os.path.splitext(self.name)[1].lower()
+
+    def __fspath__(self):
+        return self.path
+
+    def __str__(self):
+        return self.path
+
+    def __repr__(self):
+        return f"FileEntry({self.path!r}, size={self.size})"
+
+    def __eq__(self, other):
+        if isinstance(other, FileEntry):
+            return self.path == other.path
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.path)
+
+
+def as_entry(file):
+    if isinstance(file, FileEntry):
+        return file
+    return FileEntry.from_path(os.fspath(file))
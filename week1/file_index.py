@@ -0,0 +1,254 @@
+import os
+import sqlite3
+import logging
+import threading
+
+from file_entry import FileEntry
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILENAME = '.file_index.sqlite'
+
+_FETCH_SIZE = 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    dir TEXT NOT NULL,
+    name TEXT NOT NULL,
+    extension TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    ctime REAL NOT NULL,
+    atime REAL NOT NULL,
+    inode INTEGER NOT NULL,
+    dev INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_dir ON files(dir);
+CREATE INDEX IF NOT EXISTS files_extension ON files(extension);
+CREATE TABLE IF NOT EXISTS dirs (
+    path TEXT PRIMARY KEY,
+    parent TEXT,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS blobs (
+    name TEXT PRIMARY KEY,
+    data BLOB NOT NULL
+);
+"""
+
+
+def is_index_file(name):
+    return name.startswith(INDEX_FILENAME)
+
+
+class FileIndex:
+    """On-disk metadata index of every file below a root directory.
+
+    A directory whose mtime is unchanged since the last refresh has the same
+    set of entries, so its listing is served from the index and only its
+    known subdirectories are visited. Edits that do not add, remove or rename
+    entries leave the parent mtime alone; use refresh(full=True) to pick those
+    up.
+
+    One connection is shared by every thread (e.g. asyncio.to_thread
+    workers); a lock serializes its use, and queries fetch in batches so no
+    lock is held while the caller consumes results.
+    """
+
+    def __init__(self, root_directory, index_path=None):
+        self.root_directory = os.path.abspath(root_directory)
+        if index_path is None:
+            index_path = os.path.join(self.root_directory, INDEX_FILENAME)
+        self.index_path = index_path
+        self.conn = sqlite3.connect(index_path, check_same_thread=False)
+        self._lock = threading.RLock()
+        # The index can always be rebuilt, so skip the on-disk rollback journal;
+        # it would also bump the root directory's mtime on every write.
+        self.conn.execute("PRAGMA journal_mode=MEMORY")
+        self.conn.execute("PRAGMA synchronous=OFF")
+        self.conn.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def refresh(self, full=False):
+        with self._lock:
+            changes = self._refresh(full)
+        logger.info(
+            "Index refreshed: %d directories scanned, %d unchanged, %d added, %d updated, %d removed",
+            changes['scanned_dirs'], changes['skipped_dirs'], len(changes['added']),
+            len(changes['updated']), len(changes['removed'])
+        )
+        return changes
+
+    def _refresh(self, full):
+        known_dirs = {}
+        children = {}
+        for path, parent, mtime_ns in self.conn.execute("SELECT path, parent, mtime_ns FROM dirs"):
+            known_dirs[path] = mtime_ns
+            children.setdefault(parent, []).append(path)
+
+        changes = {'scanned_dirs': 0, 'skipped_dirs': 0, 'added': [], 'updated': [], 'removed': []}
+        seen_dirs = set()
+        pending = [(self.root_directory, None)]
+
+        with self.conn:
+            while pending:
+                directory, parent = pending.pop()
+                try:
+                    mtime_ns = os.stat(directory).st_mtime_ns
+                except OSError as e:
+                    logger.warning("Unable to index directory %s: %s", directory, e)
+                    continue
+                seen_dirs.add(directory)
+
+                if not full and known_dirs.get(directory) == mtime_ns:
+                    changes['skipped_dirs'] += 1
+                    pending.extend((child, directory) for child in children.get(directory, ()))
+                    continue
+
+                changes['scanned_dirs'] += 1
+                subdirs = self._rescan_directory(directory, changes)
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO dirs (path, parent, mtime_ns) VALUES (?, ?, ?)",
+                    (directory, parent, mtime_ns)
+                )
+                pending.extend((child, directory) for child in subdirs)
+
+            gone = [path for path in known_dirs if path not in seen_dirs]
+            for path in gone:
+                self.conn.execute("DELETE FROM dirs WHERE path = ?", (path,))
+                rows = self.conn.execute("SELECT path FROM files WHERE dir = ?", (path,)).fetchall()
+                changes['removed'].extend(row[0] for row in rows)
+                self.conn.execute("DELETE FROM files WHERE dir = ?", (path,))
+        return changes
+
+    def _rescan_directory(self, directory, changes):
+        indexed = {
+            row[0]: (row[1], row[2])
+            for row in self.conn.execute("SELECT path, size, mtime FROM files WHERE dir = ?", (directory,))
+        }
+        subdirs = []
+        rows = []
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.path)
+                            continue
+                        if not entry.is_file() or is_index_file(entry.name):
+                            continue
+                        file_entry = FileEntry.from_dir_entry(entry)
+                    except OSError as e:
+                        logger.warning("Skipping %s: %s", entry.path, e)
+                        continue
+
+                    previous = indexed.pop(file_entry.path, None)
+                    if previous is None:
+                        changes['added'].append(file_entry.path)
+                    elif previous != (file_entry.size, file_entry.mtime):
+                        changes['updated'].append(file_entry.path)
+                    rows.append((
+                        file_entry.path, directory, file_entry.name, file_entry.extension,
+                        file_entry.size, file_entry.mtime, file_entry.ctime, file_entry.atime,
+                        file_entry.inode, file_entry.dev
+                    ))
+        except OSError as e:
+            logger.warning("Unable to scan directory %s: %s", directory, e)
+
+        self.conn.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        if indexed:
+            self.conn.executemany("DELETE FROM files WHERE path = ?", [(path,) for path in indexed])
+            changes['removed'].extend(indexed)
+        return subdirs
+
+    def _directory_clause(self, directory, recursive):
+        if directory is None:
+            directory = self.root_directory
+        directory = os.path.abspath(directory)
+        if not recursive:
+            return "dir = ?", [directory]
+        prefix = directory.rstrip(os.sep) + os.sep
+        return "(dir = ? OR substr(dir, 1, ?) = ?)", [directory, len(prefix), prefix]
+
+    def _query(self, where, params):
+        sql = "SELECT path, name, size, mtime, ctime, atime, inode, dev FROM files WHERE " + where
+        with self._lock:
+            cursor = self.conn.execute(sql, params)
+            rows = cursor.fetchmany(_FETCH_SIZE)
+        while rows:
+            for row in rows:
+                yield FileEntry(*row)
+            with self._lock:
+                rows = cursor.fetchmany(_FETCH_SIZE)
+
+    def entries(self, directory=None, recursive=True):
+        where, params = self._directory_clause(directory, recursive)
+        return self._query(where, params)
+
+    def is_stale(self, directory=None, recursive=True):
+        """True if a directory below directory was added, removed or changed since the last refresh.
+
+        Costs one stat per indexed directory; like refresh(), it cannot see
+        files edited in place.
+        """
+        if directory is None:
+            directory = self.root_directory
+        directory = os.path.abspath(directory)
+        with self._lock:
+            if recursive:
+                prefix = directory.rstrip(os.sep) + os.sep
+                rows = self.conn.execute(
+                    "SELECT path, mtime_ns FROM dirs WHERE path = ? OR substr(path, 1, ?) = ?",
+                    (directory, len(prefix), prefix)
+                ).fetchall()
+            else:
+                rows = self.conn.execute("SELECT path, mtime_ns FROM dirs WHERE path = ?", (directory,)).fetchall()
+        if not rows:
+            return True
+        for path, mtime_ns in rows:
+            try:
+                if os.stat(path).st_mtime_ns != mtime_ns:
+                    return True
+            except OSError:
+                return True
+        return False
+
+    def search(self, search_term, directory=None, recursive=True, case_sensitive=False):
+        where, params = self._directory_clause(directory, recursive)
+        if case_sensitive:
+            where += " AND instr(name, ?) > 0"
+            params.append(search_term)
+        else:
+            where += " AND instr(lower(name), ?) > 0"
+            params.append(search_term.lower())
+        return self._query(where, params)
+
+    def get(self, path):
+        rows = list(self._query("path = ?", [os.path.abspath(path)]))
+        return rows[0] if rows else None
+
+    def load_blob(self, name):
+        """Return the bytes stored under name by save_blob(), or None."""
+        with self._lock:
+            row = self.conn.execute("SELECT data FROM blobs WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def save_blob(self, name, data):
+        # Kept in the database rather than a side file: creating or replacing
+        # a file in the root would change the mtime the index just recorded
+        with self._lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO blobs (name, data) VALUES (?, ?)", (name, data))
+
+    def __len__(self):
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
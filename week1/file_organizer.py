@@ -1,201 +1,475 @@
 import os
-import shutil
+import time
 import datetime
 import logging
-from collections import defaultdict
 import re
+import heapq
+import fnmatch
+from operator import itemgetter
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    filename='file_operations.log',
-    filemode='a'
-)
+from file_entry import FileEntry, as_entry
+from file_index import FileIndex
+from trigram_index import TrigramIndex, TRIGRAM_BLOB
+from copy_executor import CopyExecutor
+from transfer import TRANSFER_MODES, transfer_file
+from dedupe import find_duplicates
+from backup_store import BackupStore
+from archive_writer import write_archive
+from multi_search import PatternSet
+from content_search import grep_files
+from file_watcher import watch_changes
+from organize_rules import RuleSet, size_bucket
+from organize_plan import build_plan, apply_plan
+from run_journal import RunJournal
+from tree_walker import walk_files, glob_matcher
+from external_sort import external_sort
+from file_table import FileTable
+from disk_usage import UsageAggregator
+import metrics
+
+logger = logging.getLogger(__name__)
 
 class FileOrganizer:
-    def __init__(self, root_directory):
+    def __init__(self, root_directory, use_index=False, executor=None, use_trigrams=False, scan_workers=1,
+                 index_max_age=None):
         self.root_directory = os.path.abspath(root_directory)
+        self.executor = executor if executor is not None else CopyExecutor()
+        # Number of threads scan_files uses to walk directory trees that are not indexed
+        self.scan_workers = scan_workers
+        # Seconds an index answer may be out of date before a query first checks
+        # the indexed directories' mtimes (one stat each) and refreshes; None
+        # leaves refreshing to explicit refresh_index() calls
+        self.index_max_age = index_max_age
+        self._index_checked = 0.0
         if not os.path.exists(self.root_directory):
             os.makedirs(self.root_directory)
-            logging.info(f"Created root directory: {self.root_directory}")
-        logging.info(f"Initialized FileOrganizer with root directory: {self.root_directory}")
+            logger.info("Created root directory: %s", self.root_directory)
+        self.index = None
+        self.use_trigrams = use_trigrams
+        self.trigram_index = None
+        if use_index or use_trigrams:
+            self.refresh_index()
+        logger.info("Initialized FileOrganizer with root directory: %s", self.root_directory)
+
+    def refresh_index(self, full=False):
+        if self.index is None:
+            self.index = FileIndex(self.root_directory)
+        changes = self.index.refresh(full=full)
+        self._index_checked = time.monotonic()
+        if self.use_trigrams:
+            self._refresh_trigrams(changes)
+        return changes
+
+    def _refresh_trigrams(self, changes):
+        changed = bool(changes['added'] or changes['removed'])
+        if self.trigram_index is None:
+            data = self.index.load_blob(TRIGRAM_BLOB)
+            try:
+                if data is None:
+                    raise ValueError("none stored")
+                self.trigram_index = TrigramIndex.from_bytes(data)
+            except ValueError as e:
+                logger.info("Building trigram index (%s)", e)
+            else:
+                self.trigram_index.update(changes)
+            # A stale copy (e.g. the metadata index was refreshed without it) is rebuilt
+            if self.trigram_index is None or len(self.trigram_index) != len(self.index):
+                self.trigram_index = TrigramIndex.build(entry.path for entry in self.index.entries())
+                changed = True
+        else:
+            self.trigram_index.update(changes)
+        if changed:
+            self.index.save_blob(TRIGRAM_BLOB, self.trigram_index.to_bytes())
+
+    def close(self):
+        if self.index is not None:
+            self.index.close()
+            self.index = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _refresh_if_stale(self, directory, recursive):
+        if self.index_max_age is None:
+            return
+        now = time.monotonic()
+        if now - self._index_checked < self.index_max_age:
+            return
+        self._index_checked = now
+        if self.index.is_stale(directory, recursive):
+            self.refresh_index()
+
+    def _indexed(self, directory):
+        if self.index is None:
+            return False
+        return os.path.commonpath([self.root_directory, directory]) == self.root_directory
+
+    def _entry(self, file):
+        if isinstance(file, FileEntry):
+            return file
+        if self.index is not None:
+            entry = self.index.get(file)
+            if entry is not None:
+                return entry
+        return as_entry(file)
 
-    def list_files(self, directory=None, recursive=False):
+    def scan_files(self, directory=None, recursive=False, extensions=None, exclude_dirs=None, include=None,
+                   max_depth=None, workers=None):
+        if directory is None:
+            directory = self.root_directory
+        else:
+            directory = os.path.abspath(directory)
+        if not recursive:
+            max_depth = 0
+        if workers is None:
+            workers = self.scan_workers
+
+        if self._indexed(directory):
+            self._refresh_if_stale(directory, max_depth != 0)
+            if extensions is not None:
+                extensions = {ext.lower() if ext.startswith('.') else '.' + ext.lower() for ext in extensions}
+            include_match = glob_matcher(include)
+            for entry in self.index.entries(directory, recursive=max_depth != 0):
+                if extensions is not None and entry.extension not in extensions:
+                    continue
+                if include_match is not None and not include_match(entry.name):
+                    continue
+                if exclude_dirs or max_depth:
+                    parents = [
+                        part for part in os.path.relpath(os.path.dirname(entry.path), directory).split(os.sep)
+                        if part != os.curdir
+                    ]
+                    if max_depth is not None and len(parents) > max_depth:
+                        continue
+                    if exclude_dirs and any(fnmatch.fnmatch(part, pattern)
+                                            for part in parents for pattern in exclude_dirs):
+                        continue
+                yield entry
+            return
+
+        yield from walk_files(directory, workers=workers, max_depth=max_depth, extensions=extensions,
+                              include=include, exclude_dirs=exclude_dirs)
+
+    def list_files(self, directory=None, recursive=False, with_stats=False):
         if directory is None:
             directory = self.root_directory
         else:
             directory = os.path.abspath(directory)
             
-        logging.info(f"Listing files in directory: {directory}, recursive={recursive}")
+        logger.info("Listing files in directory: %s, recursive=%s", directory, recursive)
         
-        file_list = []
-        
-        if recursive:
-            for root, _, files in os.walk(directory):
-                for file in files:
-                    file_list.append(os.path.join(root, file))
+        with metrics.phase('scan'):
+            entries = list(self.scan_files(directory, recursive=recursive))
+        metrics.count('files_scanned', len(entries))
+        if with_stats:
+            file_list = entries
         else:
-            for item in os.listdir(directory):
-                item_path = os.path.join(directory, item)
-                if os.path.isfile(item_path):
-                    file_list.append(item_path)
+            file_list = [entry.path for entry in entries]
                     
-        logging.info(f"Found {len(file_list)} files")
+        logger.info("Found %s files", len(file_list))
         return file_list
 
+    def file_table(self, directory=None, recursive=False, **scan_options):
+        """Scan into a columnar FileTable, which can be grouped or passed as files= to organize_by_*."""
+        with metrics.phase('scan'):
+            table = FileTable.from_entries(self.scan_files(directory, recursive=recursive, **scan_options))
+        metrics.count('files_scanned', len(table))
+        logger.info("Loaded %s files into a file table", len(table))
+        return table
+
+    def disk_usage(self, directory=None, top=10, date_format='%Y-%m', time_column='mtime', max_depth=None,
+                   **scan_options):
+        """Report counts and bytes per extension, size bucket, date bucket and subtree, in one scan.
+
+        Only stat data is used; file contents are never read. See disk_usage.py
+        for the report layout, JSON/CSV export and the command-line front-end.
+        """
+        if directory is None:
+            directory = self.root_directory
+        aggregator = UsageAggregator(directory, top=top, date_format=date_format, time_column=time_column)
+        with metrics.phase('scan'):
+            aggregator.update(self.scan_files(directory, recursive=True, **scan_options))
+        metrics.count('files_scanned', aggregator.files)
+        logger.info("Disk usage of %s: %s files, %s bytes", directory, aggregator.files, aggregator.bytes)
+        return aggregator.report(max_depth=max_depth)
+
     def get_file_info(self, file_path):
-        if not os.path.isfile(file_path):
-            logging.warning(f"File not found: {file_path}")
+        if not isinstance(file_path, FileEntry) and not os.path.isfile(file_path):
+            logger.warning("File not found: %s", file_path)
             return None
+        entry = self._entry(file_path)
             
-        stats = os.stat(file_path)
         file_info = {
-            'name': os.path.basename(file_path),
-            'path': os.path.abspath(file_path),
-            'size': stats.st_size,
-            'extension': os.path.splitext(file_path)[1].lower(),
-            'created': datetime.datetime.fromtimestamp(stats.st_ctime),
-            'modified': datetime.datetime.fromtimestamp(stats.st_mtime),
-            'accessed': datetime.datetime.fromtimestamp(stats.st_atime)
+            'name': entry.name,
+            'path': os.path.abspath(entry.path),
+            'size': entry.size,
+            'extension': entry.extension,
+            'created': datetime.datetime.fromtimestamp(entry.ctime),
+            'modified': datetime.datetime.fromtimestamp(entry.mtime),
+            'accessed': datetime.datetime.fromtimestamp(entry.atime)
         }
         
         return file_info
 
-    def sort_files(self, files, sort_by='name', reverse=False):
+    def _sort_key(self, sort_by):
+        sort_keys = {
+            'name': lambda x: os.path.basename(x).lower(),
+            'type': lambda x: os.path.splitext(x)[1].lower(),
+            'date': lambda x: self._entry(x).mtime,
+            'size': lambda x: self._entry(x).size,
+        }
+        criteria = [sort_by] if isinstance(sort_by, str) else list(sort_by)
+        for i, criterion in enumerate(criteria):
+            if criterion not in sort_keys:
+                logger.warning("Invalid sort criteria: %s. Using 'name' instead.", criterion)
+                criteria[i] = 'name'
+        if len(criteria) == 1:
+            return sort_keys[criteria[0]]
+        key_functions = [sort_keys[criterion] for criterion in criteria]
+        return lambda x: tuple(key_function(x) for key_function in key_functions)
 
-        logging.info(f"Sorting files by {sort_by}, reverse={reverse}")
-        
-        if sort_by == 'name':
-            return sorted(files, key=lambda x: os.path.basename(x).lower(), reverse=reverse)
-        elif sort_by == 'type':
-            return sorted(files, key=lambda x: os.path.splitext(x)[1].lower(), reverse=reverse)
-        elif sort_by == 'date':
-            return sorted(files, key=lambda x: os.path.getmtime(x), reverse=reverse)
-        elif sort_by == 'size':
-            return sorted(files, key=lambda x: os.path.getsize(x), reverse=reverse)
-        else:
-            logging.warning(f"Invalid sort criteria: {sort_by}. Using 'name' instead.")
-            return sorted(files, key=lambda x: os.path.basename(x).lower(), reverse=reverse)
+    def sort_files(self, files, sort_by='name', reverse=False, limit=None, max_in_memory=None):
+        """Sort files by one criterion or a sequence of them, e.g. ('type', 'size').
+
+        With limit only the first limit files are selected, with a heap, in
+        O(limit) memory. With max_in_memory, larger inputs are sorted in runs
+        spilled to temporary files and an iterator over the merged runs is
+        returned instead of a list. Each file's key is computed once.
+        """
+        logger.info("Sorting files by %s, reverse=%s, limit=%s", sort_by, reverse, limit)
+
+        key = self._sort_key(sort_by)
+        decorated = ((key(file), file) for file in files)
+
+        if limit is not None:
+            select = heapq.nlargest if reverse else heapq.nsmallest
+            return [file for _, file in select(limit, decorated, key=itemgetter(0))]
+        if max_in_memory is not None:
+            return (file for _, file in external_sort(decorated, itemgetter(0), reverse, max_in_memory))
+        return [file for _, file in sorted(decorated, key=itemgetter(0), reverse=reverse)]
+
+    def find_duplicates(self, directory=None, recursive=True, files=None, workers=None):
+        if files is None:
+            files = self.scan_files(directory, recursive=recursive)
+        return find_duplicates((self._entry(file) for file in files), workers=workers)
+
+    def deduplicate(self, directory=None, recursive=True, files=None, workers=None):
+        reclaimed = 0
+        groups = self.find_duplicates(directory, recursive, files, workers)
+        for group in groups:
+            canonical = group[0]
+            for duplicate in group[1:]:
+                if (duplicate.dev, duplicate.inode) == (canonical.dev, canonical.inode):
+                    continue
+                try:
+                    transfer_file(canonical.path, duplicate.path, 'hardlink')
+                except OSError as e:
+                    logger.error("Failed to deduplicate %s: %s", duplicate.path, e)
+                    continue
+                reclaimed += duplicate.size
+                logger.debug("Replaced %s with a hardlink to %s", duplicate.path, canonical.path)
+        logger.info("Deduplicated %s groups, reclaimed %s bytes", len(groups), reclaimed)
+        return groups, reclaimed
+
+    def _organize(self, files, target_dir, categorize, executor=None, transfer_mode='auto', duplicates=None,
+                  on_collision='rename', dry_run=False, journal=None, resume=False, progress=None):
+        if transfer_mode not in TRANSFER_MODES:
+            raise ValueError(f"Invalid transfer mode: {transfer_mode}")
+        if duplicates not in (None, 'skip', 'hardlink'):
+            raise ValueError(f"Invalid duplicates handling: {duplicates}")
+
+        with metrics.phase('stat'):
+            entries = [self._entry(file) for file in files]
+        duplicate_of = {}
+        if duplicates is not None:
+            for group in find_duplicates(entries):
+                for duplicate in group[1:]:
+                    duplicate_of[duplicate.path] = group[0].path
+            logger.info("%s duplicate files will be handled with '%s'", len(duplicate_of), duplicates)
+
+        journaled = None
+        if resume and journal is not None:
+            journaled = {source: destination for source, destination in RunJournal.read(journal)}
+        with metrics.phase('plan'):
+            plan = build_plan(entries, target_dir, categorize, transfer_mode, duplicate_of, duplicates, on_collision,
+                              resume, journaled)
+        if dry_run:
+            return plan
+        return self.apply_plan(plan, executor, journal, resume, progress)
+
+    def apply_plan(self, plan, executor=None, journal=None, resume=False, progress=None):
+        """Execute an OrganizePlan returned by an organize_by_* call with dry_run=True.
+
+        journal is the path of a RunJournal recording every completed transfer;
+        it is appended to when resuming and started afresh otherwise.
+        """
+        if executor is None:
+            executor = self.executor
+        if journal is None:
+            return apply_plan(plan, executor, progress=progress)
+        with RunJournal(journal).open(truncate=not resume) as run_journal:
+            return apply_plan(plan, executor, run_journal, progress)
 
-    def organize_by_type(self, source_dir=None, target_dir=None):
+    def profile(self, method, *args, trace_memory=False, profile_path=None, **kwargs):
+        """Call self.<method>(*args, **kwargs) under cProfile (and tracemalloc if trace_memory).
+
+        Returns (result, capture); capture.report() formats the hottest
+        functions and allocation sites. See metrics.py for the phase timers.
+        """
+        return metrics.profile_call(getattr(self, method), *args, trace_memory=trace_memory,
+                                    profile_path=profile_path, **kwargs)
+
+    def type_category(self, file):
+        ext = os.path.splitext(file)[1].lower()
+        return ext[1:] if ext else "no_extension"
+
+    def date_category(self, file, date_format='%Y-%m'):
+        creation_time = datetime.datetime.fromtimestamp(self._entry(file).ctime)
+        return creation_time.strftime(date_format)
+
+    def size_category(self, file):
+        return size_bucket(self._entry(file).size)
+
+    def organize_by_type(self, source_dir=None, target_dir=None, files=None, **options):
 
         if source_dir is None:
             source_dir = self.root_directory
         if target_dir is None:
             target_dir = self.root_directory
             
-        logging.info(f"Organizing files by type from {source_dir} to {target_dir}")
-        
-        files = self.list_files(source_dir)
-        extensions_map = defaultdict(list)
+        logger.info("Organizing files by type from %s to %s", source_dir, target_dir)
         
-        for file in files:
-            ext = os.path.splitext(file)[1].lower()
-            if ext:
-                ext = ext[1:]
-                type_dir = os.path.join(target_dir, ext)
-                
-                if not os.path.exists(type_dir):
-                    os.makedirs(type_dir)
-                    logging.info(f"Created directory for {ext} files: {type_dir}")
-                
-                dest_file = os.path.join(type_dir, os.path.basename(file))
-                shutil.copy2(file, dest_file)
-                logging.info(f"Copied {file} to {dest_file}")
-                extensions_map[ext].append(dest_file)
-            else:
+        if files is None:
+            files = self.list_files(source_dir, with_stats=True)
+        if isinstance(files, FileTable):
+            return self._organize(files, target_dir, files.labels('type'), **options)
 
-                no_ext_dir = os.path.join(target_dir, "no_extension")
-                if not os.path.exists(no_ext_dir):
-                    os.makedirs(no_ext_dir)
-                    logging.info(f"Created directory for files with no extension: {no_ext_dir}")
-                
-                dest_file = os.path.join(no_ext_dir, os.path.basename(file))
-                shutil.copy2(file, dest_file)
-                logging.info(f"Copied {file} to {dest_file}")
-                extensions_map["no_extension"].append(dest_file)
-        
-        return dict(extensions_map)
+        return self._organize(files, target_dir, self.type_category, **options)
 
-    def organize_by_date(self, source_dir=None, target_dir=None, date_format='%Y-%m'):
+    def organize_by_date(self, source_dir=None, target_dir=None, date_format='%Y-%m', files=None, **options):
 
         if source_dir is None:
             source_dir = self.root_directory
         if target_dir is None:
             target_dir = self.root_directory
             
-        logging.info(f"Organizing files by date from {source_dir} to {target_dir} using format {date_format}")
-        
-        files = self.list_files(source_dir)
-        date_map = defaultdict(list)
+        logger.info("Organizing files by date from %s to %s using format %s", source_dir, target_dir, date_format)
         
-        for file in files:
-            creation_time = datetime.datetime.fromtimestamp(os.path.getctime(file))
-            date_folder = creation_time.strftime(date_format)
-            date_dir = os.path.join(target_dir, date_folder)
-            
-            if not os.path.exists(date_dir):
-                os.makedirs(date_dir)
-                logging.info(f"Created directory for {date_folder}: {date_dir}")
-            
-            dest_file = os.path.join(date_dir, os.path.basename(file))
-            shutil.copy2(file, dest_file)
-            logging.info(f"Copied {file} to {dest_file}")
-            date_map[date_folder].append(dest_file)
-        
-        return dict(date_map)
+        if files is None:
+            files = self.list_files(source_dir, with_stats=True)
+        if isinstance(files, FileTable):
+            return self._organize(files, target_dir, files.labels('date', date_format=date_format), **options)
 
-    def organize_by_size(self, source_dir=None, target_dir=None):
+        return self._organize(files, target_dir, lambda file: self.date_category(file, date_format), **options)
+
+    def organize_by_size(self, source_dir=None, target_dir=None, files=None, **options):
 
         if source_dir is None:
             source_dir = self.root_directory
         if target_dir is None:
             target_dir = self.root_directory
             
-        logging.info(f"Organizing files by size from {source_dir} to {target_dir}")
-        
-        files = self.list_files(source_dir)
-        size_map = defaultdict(list)
+        logger.info("Organizing files by size from %s to %s", source_dir, target_dir)
         
+        if files is None:
+            files = self.list_files(source_dir, with_stats=True)
+        if isinstance(files, FileTable):
+            return self._organize(files, target_dir, files.labels('size'), **options)
+
+        return self._organize(files, target_dir, self.size_category, **options)
+
+    def organize_by_rules(self, source_dir=None, target_dir=None, rules=None, files=None, recursive=False,
+                          **options):
+        """Organize files with an ordered list of rules in one pass and one copy plan.
+
+        rules are Rule objects or dicts of Rule arguments, e.g.
+        {'destination': '{ext}/{mtime:%Y-%m}/{size_bucket}', 'min_size': 1024}.
+        Files that no rule matches are left where they are.
+        """
+        if not rules:
+            raise ValueError("organize_by_rules needs at least one rule")
+        rule_set = rules if isinstance(rules, RuleSet) else RuleSet(rules)
+
+        if source_dir is None:
+            source_dir = self.root_directory
+        if target_dir is None:
+            target_dir = self.root_directory
+
+        logger.info("Organizing files by %s rules from %s to %s", len(rule_set.rules), source_dir, target_dir)
+
+        if files is None:
+            files = self.list_files(source_dir, recursive=recursive, with_stats=True)
+
+        return self._organize(files, target_dir, lambda file: rule_set.destination(self._entry(file)), **options)
 
-        size_categories = {
-            "tiny": (0, 10 * 1024),  # 0 - 10 KB
-            "small": (10 * 1024, 1 * 1024 * 1024),  # 10 KB - 1 MB
-            "medium": (1 * 1024 * 1024, 100 * 1024 * 1024),  # 1 MB - 100 MB
-            "large": (100 * 1024 * 1024, 1 * 1024 * 1024 * 1024),  # 100 MB - 1 GB
-            "huge": (1 * 1024 * 1024 * 1024, float('inf'))  # > 1 GB
+    def watch(self, source_dir=None, target_dir=None, organize_by='type', debounce=1.0, poll_interval=1.0,
+              backend='auto', stop_event=None, **options):
+        """Organize files as they are created or modified in source_dir.
+
+        Yields the result of each organize call, one per debounced batch of
+        changed files; stop by setting stop_event or closing the generator.
+        A modified file replaces its earlier copy unless on_collision says
+        otherwise.
+        """
+        options.setdefault('on_collision', 'overwrite')
+        organizers = {
+            'type': self.organize_by_type,
+            'date': self.organize_by_date,
+            'size': self.organize_by_size,
+            'rules': self.organize_by_rules,
         }
-        
-        for file in files:
-            file_size = os.path.getsize(file)
-            category = None
-            
-            for cat_name, (min_size, max_size) in size_categories.items():
-                if min_size <= file_size < max_size:
-                    category = cat_name
-                    break
-            
-            if category:
-                size_dir = os.path.join(target_dir, category)
-                if not os.path.exists(size_dir):
-                    os.makedirs(size_dir)
-                    logging.info(f"Created directory for {category} files: {size_dir}")
-                
-                dest_file = os.path.join(size_dir, os.path.basename(file))
-                shutil.copy2(file, dest_file)
-                logging.info(f"Copied {file} to {dest_file}")
-                size_map[category].append(dest_file)
-        
-        return dict(size_map)
+        if organize_by not in organizers:
+            raise ValueError(f"Invalid organize_by: {organize_by}")
+        organize = organizers[organize_by]
+
+        if source_dir is None:
+            source_dir = self.root_directory
+        if target_dir is None:
+            target_dir = self.root_directory
+
+        logger.info("Watching %s, organizing new files by %s into %s", source_dir, organize_by, target_dir)
+
+        for batch in watch_changes(source_dir, debounce=debounce, poll_interval=poll_interval,
+                                   backend=backend, stop_event=stop_event):
+            files = []
+            for path in batch:
+                try:
+                    files.append(FileEntry.from_path(path))
+                except OSError:
+                    # Moved or deleted again before the batch was flushed
+                    continue
+            if files:
+                logger.info("Detected %s new or modified files in %s", len(files), source_dir)
+                yield organize(source_dir, target_dir, files=files, **options)
 
     def search_files(self, search_term, directory=None, recursive=True, case_sensitive=False):
 
         if directory is None:
             directory = self.root_directory
             
-        logging.info(f"Searching for '{search_term}' in {directory}, recursive={recursive}, case_sensitive={case_sensitive}")
-        
-        files = self.list_files(directory, recursive=recursive)
+        logger.info("Searching for '%s' in %s, recursive=%s, case_sensitive=%s", search_term, directory, recursive, case_sensitive)
+
+        if self._indexed(os.path.abspath(directory)):
+            self._refresh_if_stale(os.path.abspath(directory), recursive)
+        if self.trigram_index is not None and self._indexed(os.path.abspath(directory)):
+            directory = os.path.abspath(directory)
+            prefix = directory.rstrip(os.sep) + os.sep
+            matching_files = [
+                path for path in self.trigram_index.search(search_term, case_sensitive)
+                if os.path.dirname(path) == directory or (recursive and path.startswith(prefix))
+            ]
+            logger.info("Found %s files matching '%s'", len(matching_files), search_term)
+            return matching_files
+
+        if self._indexed(os.path.abspath(directory)):
+            matching_files = [entry.path for entry in self.index.search(search_term, directory, recursive, case_sensitive)]
+            logger.info("Found %s files matching '%s'", len(matching_files), search_term)
+            return matching_files
+
+        files = self.scan_files(directory, recursive=recursive)
         matching_files = []
         
         if not case_sensitive:
@@ -204,35 +478,100 @@ class FileOrganizer:
             pattern = re.compile(re.escape(search_term))
             
         for file in files:
-            filename = os.path.basename(file)
-            if pattern.search(filename):
-                matching_files.append(file)
+            if pattern.search(file.name):
+                matching_files.append(file.path)
                 
-        logging.info(f"Found {len(matching_files)} files matching '{search_term}'")
+        logger.info("Found %s files matching '%s'", len(matching_files), search_term)
         return matching_files
 
-    def create_backup(self, source_dir=None, backup_name=None):
+    def search_many(self, terms=(), globs=(), regexes=(), directory=None, recursive=True, case_sensitive=False,
+                    extensions=None, exclude_dirs=None):
+
+        patterns = PatternSet(terms, globs, regexes, case_sensitive=case_sensitive)
+        logger.info("Searching for %d patterns in %s, recursive=%s", len(patterns.patterns), directory or self.root_directory, recursive)
+
+        results = {pattern: [] for pattern in patterns.patterns}
+        for entry in self.scan_files(directory, recursive, extensions=extensions, exclude_dirs=exclude_dirs):
+            for pattern in patterns.match(entry.name):
+                results[pattern].append(entry.path)
+
+        logger.info("Found matches for %d of %d patterns", sum(1 for paths in results.values() if paths), len(results))
+        return results
 
+    def search_content(self, pattern, directory=None, recursive=True, regex=False, case_sensitive=False,
+                       extensions=None, exclude_dirs=None, files=None, max_matches_per_file=1, max_bytes=None,
+                       workers=None):
+
+        logger.info("Searching file contents for '%s' in %s, recursive=%s", pattern, directory or self.root_directory, recursive)
+
+        if files is None:
+            files = self.scan_files(directory, recursive, extensions=extensions, exclude_dirs=exclude_dirs)
+        return grep_files(
+            files, pattern, regex=regex, ignore_case=not case_sensitive,
+            max_matches=max_matches_per_file, max_bytes=max_bytes, workers=workers
+        )
+
+    def create_backup(self, source_dir=None, backup_name=None, incremental=False, archive_format=None,
+                      level=6, workers=None, progress=None, resume=None):
+        """Write an archive of source_dir, or with incremental a snapshot in a BackupStore.
+
+        Incremental backups resume an interrupted run from the store's journal
+        unless resume=False. Archives are always written from scratch, so
+        resume=True without incremental is rejected.
+        """
         if source_dir is None:
             source_dir = self.root_directory
+
+        if incremental:
+            return self._create_incremental_backup(source_dir, backup_name, progress, resume is not False)
+        if resume:
+            raise ValueError("Archive backups cannot be resumed; use incremental=True for a resumable backup")
             
         if backup_name is None:
             timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_name = f"backup_{timestamp}.zip"
+            backup_name = f"backup_{timestamp}.{archive_format or 'zip'}"
             
         backup_path = os.path.join(os.path.dirname(source_dir), backup_name)
         
-        logging.info(f"Creating backup of {source_dir} to {backup_path}")
+        logger.info("Creating backup of %s to %s", source_dir, backup_path)
         
-        shutil.make_archive(
-            os.path.splitext(backup_path)[0],  
-            'zip',
-            source_dir
-        )
+        # Scanning is interleaved with compression, so both are timed as one phase
+        with metrics.phase('compress'):
+            count = write_archive(
+                backup_path,
+                source_dir,
+                self.scan_files(source_dir, recursive=True),
+                fmt=archive_format,
+                level=level,
+                workers=workers
+            )
+        metrics.count('files_archived', count)
         
-        logging.info(f"Backup created: {backup_path}")
+        logger.info("Backup created: %s (%s files)", backup_path, count)
         return backup_path
 
+    def _create_incremental_backup(self, source_dir, store_name=None, progress=None, resume=True):
+        source_dir = os.path.abspath(source_dir)
+        if store_name is None:
+            store_name = f"{os.path.basename(source_dir)}_backups"
+        store_path = os.path.join(os.path.dirname(source_dir), store_name)
+
+        logger.info("Creating incremental backup of %s in %s", source_dir, store_path)
+
+        store = BackupStore(store_path)
+        with metrics.phase('compress'):
+            manifest_path, _ = store.backup(source_dir, self.scan_files(source_dir, recursive=True),
+                                            progress=progress, resume=resume)
+        return manifest_path
+
+    def restore_backup(self, backup_path, target_dir, snapshot=None):
+        if os.path.isfile(backup_path):
+            # A manifest path identifies both the store and the snapshot
+            if snapshot is None:
+                snapshot = os.path.splitext(os.path.basename(backup_path))[0]
+            backup_path = os.path.dirname(os.path.dirname(backup_path))
+        return BackupStore(backup_path).restore(target_dir, snapshot)
+
 
 import os
 import shutil
@@ -240,9 +579,14 @@ import time
 import random
 import string
 from file_organizer import FileOrganizer
+from logging_config import configure_logging
+
+def create_test_environment(test_dir="test_files", seed=None):
+    """Create a test directory with sample files of different types and sizes.
 
-def create_test_environment(test_dir="test_files"):
-    """Create a test directory with sample files of different types and sizes."""
+    Pass a seed to get the same files on every run; synthetic_tree.SyntheticTree
+    generates larger trees for benchmarking.
+    """
     print(f"Creating test environment in '{test_dir}'...")
     
     # Remove test directory if it exists
@@ -266,6 +610,7 @@ def create_test_environment(test_dir="test_files"):
         "py": ["script", "module", "test"]
     }
     
+    rng = random.Random(seed)
     created_files = []
     
     # Create files with various sizes and dates
@@ -276,18 +621,18 @@ def create_test_environment(test_dir="test_files"):
             filepath = os.path.join(test_dir, filename)
             
             # Create files with random content and sizes (100B to 10KB)
-            size = random.randint(100, 10240)
+            size = rng.randint(100, 10240)
             with open(filepath, 'wb') as f:
-                f.write(os.urandom(size))
+                f.write(rng.randbytes(size))
             
             created_files.append(filepath)
             
             # Create some files in subdirectories
-            if random.choice([True, False]):
-                subdir = random.choice(["docs", "images"])
+            if rng.choice([True, False]):
+                subdir = rng.choice(["docs", "images"])
                 subpath = os.path.join(test_dir, subdir, f"{prefix}_{subdir}.{ext}")
                 with open(subpath, 'wb') as f:
-                    f.write(os.urandom(size))
+                    f.write(rng.randbytes(size))
                 created_files.append(subpath)
     
     # Create a few files with older modification times
@@ -298,7 +643,7 @@ def create_test_environment(test_dir="test_files"):
             f.write(f"This is an older file {i}")
         
         # Set modification time to random time in past (1-30 days ago)
-        days_ago = random.randint(1, 30)
+        days_ago = rng.randint(1, 30)
         past_time = time.time() - (days_ago * 86400)  # 86400 seconds in a day
         os.utime(filepath, (past_time, past_time))
         
@@ -408,4 +753,5 @@ def test_file_organizer():
     print("\n-------- All tests completed --------")
 
 if __name__ == "__main__":
+    configure_logging()
     test_file_organizer()
\ No newline at end of file
@@ -0,0 +1,176 @@
+import os
+import bisect
+import datetime
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from file_entry import FileEntry
+from organize_rules import SIZE_THRESHOLDS, SIZE_BUCKETS
+
+GROUP_KEYS = ('type', 'date', 'size', 'directory')
+
+# Every UTC offset in use is a multiple of 15 minutes, so all timestamps in one
+# quarter-hour share their local date and hour
+_QUARTER_HOUR = 900
+_FINE_DIRECTIVES = ('%M', '%S', '%f', '%s', '%c', '%X', '%T', '%R', '%r')
+
+
+def date_slot_seconds(date_format):
+    """Width of the time slots whose timestamps all format the same under date_format."""
+    return 1 if any(directive in date_format for directive in _FINE_DIRECTIVES) else _QUARTER_HOUR
+
+
+class FileTable:
+    """Columnar metadata for many files.
+
+    Directories are stored once and referenced by id, extensions are
+    dictionary-encoded, names are packed into one UTF-8 buffer indexed by
+    offset, and sizes and timestamps live in typed arrays as raw epoch
+    numbers, so a row costs a few dozen bytes plus its encoded name. Iterating
+    yields FileEntry objects, so a table can be passed wherever files are
+    accepted. Columns are exposed as NumPy arrays (zero-copy) when NumPy is
+    installed and group_by then aggregates with bincount.
+    """
+
+    def __init__(self):
+        self.directories = []
+        self._directory_ids = {}
+        self.extensions = []
+        self._extension_ids = {}
+        self._names = bytearray()
+        self._name_offsets = array('Q', [0])
+        self.directory_id = array('I')
+        self.extension_id = array('I')
+        self.size = array('q')
+        self.mtime = array('d')
+        self.ctime = array('d')
+        self.atime = array('d')
+        self.inode = array('Q')
+        self.dev = array('Q')
+
+    @classmethod
+    def from_entries(cls, entries):
+        table = cls()
+        for entry in entries:
+            table.append(entry)
+        return table
+
+    def append(self, entry):
+        directory = os.path.dirname(entry.path)
+        directory_id = self._directory_ids.get(directory)
+        if directory_id is None:
+            directory_id = self._directory_ids[directory] = len(self.directories)
+            self.directories.append(directory)
+        extension = os.path.splitext(entry.name)[1].lower()
+        extension_id = self._extension_ids.get(extension)
+        if extension_id is None:
+            extension_id = self._extension_ids[extension] = len(self.extensions)
+            self.extensions.append(extension)
+
+        self._names += entry.name.encode('utf-8', 'surrogateescape')
+        self._name_offsets.append(len(self._names))
+        self.directory_id.append(directory_id)
+        self.extension_id.append(extension_id)
+        self.size.append(entry.size)
+        self.mtime.append(entry.mtime)
+        self.ctime.append(entry.ctime)
+        self.atime.append(entry.atime)
+        self.inode.append(entry.inode)
+        self.dev.append(entry.dev)
+
+    def __len__(self):
+        return len(self.size)
+
+    def name(self, row):
+        start, end = self._name_offsets[row], self._name_offsets[row + 1]
+        return self._names[start:end].decode('utf-8', 'surrogateescape')
+
+    def path(self, row):
+        return os.path.join(self.directories[self.directory_id[row]], self.name(row))
+
+    def entry(self, row):
+        name = self.name(row)
+        return FileEntry(os.path.join(self.directories[self.directory_id[row]], name), name, self.size[row],
+                         self.mtime[row], self.ctime[row], self.atime[row], self.inode[row], self.dev[row])
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield self.entry(row)
+
+    def column(self, name):
+        values = getattr(self, name)
+        return numpy.frombuffer(values, dtype=values.typecode) if numpy is not None and len(values) else values
+
+    def codes(self, by, date_format='%Y-%m', time_column='ctime'):
+        """Return (codes, labels): one small int per row indexing into labels.
+
+        by is 'type' (extension without the dot, 'no_extension' if none),
+        'date' (time_column formatted with date_format), 'size' (the
+        organize_by_size buckets) or 'directory'.
+        """
+        if by == 'type':
+            return self.column('extension_id'), [ext[1:] if ext else 'no_extension' for ext in self.extensions]
+        if by == 'directory':
+            return self.column('directory_id'), list(self.directories)
+        if by == 'size':
+            sizes = self.column('size')
+            if numpy is not None and len(sizes):
+                return numpy.searchsorted(SIZE_THRESHOLDS, sizes, side='right'), list(SIZE_BUCKETS)
+            return [bisect.bisect_right(SIZE_THRESHOLDS, size) for size in sizes], list(SIZE_BUCKETS)
+        if by == 'date':
+            return self._date_codes(self.column(time_column), date_format)
+        raise ValueError(f"Invalid group key: {by}. Expected one of {', '.join(GROUP_KEYS)}")
+
+    def _date_codes(self, times, date_format):
+        # Format one timestamp per time slot instead of one per row
+        step = date_slot_seconds(date_format)
+        labels = []
+        label_ids = {}
+
+        def label_id(slot):
+            label = datetime.datetime.fromtimestamp(slot * step).strftime(date_format)
+            code = label_ids.get(label)
+            if code is None:
+                code = label_ids[label] = len(labels)
+                labels.append(label)
+            return code
+
+        if numpy is not None and len(times):
+            slots, inverse = numpy.unique(numpy.floor_divide(times, step).astype('int64'), return_inverse=True)
+            slot_labels = numpy.array([label_id(int(slot)) for slot in slots], dtype='int64')
+            return slot_labels[inverse.reshape(-1)], labels
+
+        slot_labels = {}
+        codes = []
+        for timestamp in times:
+            slot = int(timestamp // step)
+            code = slot_labels.get(slot)
+            if code is None:
+                code = slot_labels[slot] = label_id(slot)
+            codes.append(code)
+        return codes, labels
+
+    def labels(self, by, **options):
+        codes, labels = self.codes(by, **options)
+        return [labels[code] for code in codes]
+
+    def group_by(self, by, **options):
+        """Return {label: (file_count, total_bytes)} for one of GROUP_KEYS."""
+        codes, labels = self.codes(by, **options)
+        if numpy is not None and len(self):
+            counts = numpy.bincount(codes, minlength=len(labels))
+            totals = numpy.bincount(codes, weights=self.column('size'), minlength=len(labels))
+            return {
+                labels[code]: (int(counts[code]), int(totals[code]))
+                for code in numpy.flatnonzero(counts)
+            }
+        counts = [0] * len(labels)
+        totals = [0] * len(labels)
+        for code, size in zip(codes, self.size):
+            counts[code] += 1
+            totals[code] += size
+        return {labels[code]: (counts[code], totals[code]) for code in range(len(labels)) if counts[code]}
@@ -0,0 +1,162 @@
+import os
+import time
+import errno
+import ctypes
+import ctypes.util
+import struct
+import logging
+import selectors
+
+from file_index import is_index_file
+
+logger = logging.getLogger(__name__)
+
+WATCH_BACKENDS = ('auto', 'inotify', 'poll')
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+
+_EVENT_HEADER = struct.Struct('iIII')
+_READ_SIZE = 64 * 1024
+
+
+def _list_files(directory):
+    files = {}
+    try:
+        with os.scandir(directory) as it:
+            for entry in it:
+                try:
+                    if entry.is_file() and not is_index_file(entry.name):
+                        stats = entry.stat()
+                        files[entry.path] = (stats.st_size, stats.st_mtime_ns)
+                except OSError:
+                    continue
+    except OSError as e:
+        logger.warning("Unable to scan directory %s: %s", directory, e)
+    return files
+
+
+class PollingWatcher:
+    """Reports files of one directory that appeared or changed between two polls."""
+
+    def __init__(self, directory):
+        self.directory = os.path.abspath(directory)
+        self.snapshot = _list_files(self.directory)
+
+    def poll(self, timeout):
+        if timeout:
+            time.sleep(timeout)
+        current = _list_files(self.directory)
+        changed = {path for path, stamp in current.items() if self.snapshot.get(path) != stamp}
+        self.snapshot = current
+        return changed
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """Reports files of one directory that were written or moved in, using inotify.
+
+    Only IN_CLOSE_WRITE and IN_MOVED_TO are subscribed to, so a file is
+    reported once its writer has closed it rather than on every write(2).
+    """
+
+    def __init__(self, directory):
+        self.directory = os.path.abspath(directory)
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            code = ctypes.get_errno()
+            raise OSError(code, os.strerror(code))
+        mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_DELETE_SELF | IN_MOVE_SELF
+        if libc.inotify_add_watch(self.fd, os.fsencode(self.directory), mask) < 0:
+            code = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(code, os.strerror(code), self.directory)
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.fd, selectors.EVENT_READ)
+
+    def poll(self, timeout):
+        if not self.selector.select(timeout):
+            return set()
+        changed = set()
+        while True:
+            try:
+                buffer = os.read(self.fd, _READ_SIZE)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(buffer):
+                _, mask, _, length = _EVENT_HEADER.unpack_from(buffer, offset)
+                name = buffer[offset + _EVENT_HEADER.size:offset + _EVENT_HEADER.size + length].rstrip(b'\0')
+                offset += _EVENT_HEADER.size + length
+                if mask & IN_Q_OVERFLOW:
+                    logger.warning("inotify queue overflowed for %s, rescanning", self.directory)
+                    changed.update(_list_files(self.directory))
+                elif mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+                    raise OSError(errno.ENOENT, "Watched directory is gone", self.directory)
+                elif name and not mask & IN_ISDIR:
+                    name = os.fsdecode(name)
+                    if not is_index_file(name):
+                        changed.add(os.path.join(self.directory, name))
+        return changed
+
+    def close(self):
+        self.selector.close()
+        os.close(self.fd)
+
+
+def create_watcher(directory, backend='auto'):
+    if backend not in WATCH_BACKENDS:
+        raise ValueError(f"Invalid watch backend: {backend}")
+    if backend in ('auto', 'inotify'):
+        try:
+            return InotifyWatcher(directory)
+        except (OSError, AttributeError) as e:
+            # AttributeError: libc without inotify_init1 (not Linux)
+            if backend == 'inotify':
+                raise
+            logger.info("inotify unavailable (%s), polling %s instead", e, directory)
+    return PollingWatcher(directory)
+
+
+def watch_changes(directory, debounce=1.0, poll_interval=1.0, max_delay=None, backend='auto', stop_event=None):
+    """Yield sorted batches of new or modified file paths in directory.
+
+    Events are coalesced into one batch until none has arrived for debounce
+    seconds, or until max_delay seconds after the first event of the batch
+    (default: ten times debounce) so a steady stream of writes cannot hold a
+    batch back indefinitely. Runs until stop_event is set or the generator is
+    closed.
+    """
+    if max_delay is None:
+        max_delay = debounce * 10
+    watcher = create_watcher(directory, backend)
+    pending = set()
+    first_event = last_event = 0.0
+    try:
+        while stop_event is None or not stop_event.is_set():
+            if pending:
+                now = time.monotonic()
+                timeout = max(0.0, min(last_event + debounce, first_event + max_delay) - now)
+            else:
+                timeout = poll_interval
+            changed = watcher.poll(timeout)
+            now = time.monotonic()
+            if changed:
+                if not pending:
+                    first_event = now
+                pending |= changed
+                last_event = now
+            if pending and (now - last_event >= debounce or now - first_event >= max_delay):
+                batch = sorted(pending)
+                pending = set()
+                yield batch
+    finally:
+        watcher.close()
@@ -0,0 +1,139 @@
+import os
+import queue
+import atexit
+import logging
+import threading
+import logging.handlers
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+_listener = None
+
+
+class BatchingRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """RotatingFileHandler that writes a whole batch of records with one write call."""
+
+    def emit_batch(self, records):
+        if not records:
+            return
+        try:
+            text = ''.join(self.format(record) + self.terminator for record in records)
+            if self.stream is None:
+                self.stream = self._open()
+            # An empty file is never rotated, so a batch larger than maxBytes
+            # still gets written (alone) instead of rotating forever
+            position = self.stream.tell()
+            if self.maxBytes > 0 and position and position + len(text) >= self.maxBytes:
+                self.doRollover()
+                if self.stream is None:
+                    self.stream = self._open()
+            self.stream.write(text)
+            self.stream.flush()
+        except Exception:
+            for record in records:
+                self.handleError(record)
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    def __init__(self, log_queue, file_handler):
+        super().__init__(log_queue)
+        self.file_handler = file_handler
+        self._pid = os.getpid()
+        self._child_handler = None
+
+    # QueueHandler.prepare() formats the message on the calling thread; leave
+    # the %-style arguments unmerged so formatting happens on the writer thread.
+    def prepare(self, record):
+        return record
+
+    def emit(self, record):
+        if os.getpid() == self._pid:
+            super().emit(record)
+            return
+        # A forked worker (e.g. a ProcessPoolExecutor child) inherits this
+        # handler but not the writer thread, so it appends to the file itself
+        if self._child_handler is None:
+            self._child_handler = logging.FileHandler(self.file_handler.baseFilename, delay=True)
+            self._child_handler.setFormatter(self.file_handler.formatter)
+            self._child_handler.setLevel(self.file_handler.level)
+        self._child_handler.handle(record)
+
+
+class BackgroundLogWriter:
+    def __init__(self, log_queue, handler, batch_size=512, flush_interval=0.5):
+        self.queue = log_queue
+        self.handler = handler
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._sentinel = object()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='log-writer', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                record = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch = []
+            stopping = record is self._sentinel
+            if not stopping:
+                batch.append(record)
+            while len(batch) < self.batch_size and not stopping:
+                try:
+                    record = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if record is self._sentinel:
+                    stopping = True
+                else:
+                    batch.append(record)
+            self.handler.emit_batch([record for record in batch if record.levelno >= self.handler.level])
+            if stopping:
+                return
+
+    def stop(self):
+        if self._thread is not None:
+            self.queue.put(self._sentinel)
+            self._thread.join()
+            self._thread = None
+        self.handler.close()
+
+
+def configure_logging(filename='file_operations.log', level=logging.INFO, max_bytes=10 * 1024 * 1024,
+                      backup_count=5, batch_size=512, logger=None):
+    """Send log records to a size-rotated file through a background writer thread.
+
+    Nothing is configured at import time; call this once from the application.
+    """
+    global _listener
+    shutdown_logging()
+
+    handler = BatchingRotatingFileHandler(filename, maxBytes=max_bytes, backupCount=backup_count, delay=True)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    handler.setLevel(level)
+
+    log_queue = queue.SimpleQueue()
+    target = logger if logger is not None else logging.getLogger()
+    for existing in list(target.handlers):
+        if isinstance(existing, _DeferredQueueHandler):
+            target.removeHandler(existing)
+    target.addHandler(_DeferredQueueHandler(log_queue, handler))
+    target.setLevel(level)
+
+    _listener = BackgroundLogWriter(log_queue, handler, batch_size=batch_size)
+    _listener.start()
+    return _listener
+
+
+def shutdown_logging():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
@@ -0,0 +1,269 @@
+import os
+import io
+import json
+import time
+import bisect
+import pstats
+import cProfile
+import threading
+import tracemalloc
+import contextlib
+
+# Upper bounds, in seconds, of the latency histogram buckets
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, float('inf'))
+
+PREFIX = 'organizer'
+
+_registry = None
+_null_phase = contextlib.nullcontext()
+
+
+class Histogram:
+    __slots__ = ('bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * len(bounds)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self):
+        cumulative = []
+        total = 0
+        for bound, count in zip(self.bounds, self.counts):
+            total += count
+            cumulative.append(['+Inf' if bound == float('inf') else bound, total])
+        return {'buckets': cumulative, 'sum': self.sum, 'count': self.count}
+
+
+class _Phase:
+    __slots__ = ('registry', 'name', 'started')
+
+    def __init__(self, registry, name):
+        self.registry = registry
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.registry.add_time(self.name, time.perf_counter() - self.started)
+
+
+class Registry:
+    """Phase timers, counters and histograms for one collection period.
+
+    Updates take a lock, since copies report from executor threads. flush()
+    hands a snapshot to every sink.
+    """
+
+    def __init__(self, sinks=()):
+        self.sinks = list(sinks)
+        self.phases = {}
+        self.counters = {}
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def phase(self, name):
+        return _Phase(self, name)
+
+    def add_time(self, name, seconds):
+        with self._lock:
+            totals = self.phases.get(name)
+            if totals is None:
+                self.phases[name] = [seconds, 1]
+            else:
+                totals[0] += seconds
+                totals[1] += 1
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name, value):
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(value)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'time': time.time(),
+                'phases': {name: {'seconds': seconds, 'calls': calls} for name, (seconds, calls) in self.phases.items()},
+                'counters': dict(self.counters),
+                'histograms': {name: histogram.snapshot() for name, histogram in self.histograms.items()},
+            }
+
+    def flush(self):
+        snapshot = self.snapshot()
+        for sink in self.sinks:
+            sink.emit(snapshot)
+        return snapshot
+
+
+class MemorySink:
+    def __init__(self):
+        self.snapshots = []
+
+    def emit(self, snapshot):
+        self.snapshots.append(snapshot)
+
+
+def _write_atomic(path, text):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+class JsonSink:
+    def __init__(self, path):
+        self.path = path
+
+    def emit(self, snapshot):
+        _write_atomic(self.path, json.dumps(snapshot, indent=2))
+
+
+def prometheus_text(snapshot, prefix=PREFIX):
+    lines = []
+    if snapshot['phases']:
+        lines.append(f"# TYPE {prefix}_phase_seconds_total counter")
+        for name, totals in sorted(snapshot['phases'].items()):
+            lines.append(f'{prefix}_phase_seconds_total{{phase="{name}"}} {totals["seconds"]}')
+        lines.append(f"# TYPE {prefix}_phase_calls_total counter")
+        for name, totals in sorted(snapshot['phases'].items()):
+            lines.append(f'{prefix}_phase_calls_total{{phase="{name}"}} {totals["calls"]}')
+    for name, value in sorted(snapshot['counters'].items()):
+        lines.append(f"# TYPE {prefix}_{name}_total counter")
+        lines.append(f"{prefix}_{name}_total {value}")
+    for name, histogram in sorted(snapshot['histograms'].items()):
+        lines.append(f"# TYPE {prefix}_{name} histogram")
+        for bound, count in histogram['buckets']:
+            lines.append(f'{prefix}_{name}_bucket{{le="{bound}"}} {count}')
+        lines.append(f"{prefix}_{name}_sum {histogram['sum']}")
+        lines.append(f"{prefix}_{name}_count {histogram['count']}")
+    return '\n'.join(lines) + '\n'
+
+
+class PrometheusSink:
+    """Writes the text exposition format, e.g. for node_exporter's textfile collector."""
+
+    def __init__(self, path, prefix=PREFIX):
+        self.path = path
+        self.prefix = prefix
+
+    def emit(self, snapshot):
+        _write_atomic(self.path, prometheus_text(snapshot, self.prefix))
+
+
+def enable(registry=None):
+    """Start collecting into registry (a new one by default) and return it."""
+    global _registry
+    _registry = registry if registry is not None else Registry()
+    return _registry
+
+
+def disable():
+    """Stop collecting; the previous registry is returned after a final flush."""
+    global _registry
+    registry, _registry = _registry, None
+    if registry is not None:
+        registry.flush()
+    return registry
+
+
+def active():
+    return _registry
+
+
+@contextlib.contextmanager
+def collecting(*sinks):
+    registry = enable(Registry(sinks))
+    try:
+        yield registry
+    finally:
+        if _registry is registry:
+            disable()
+
+
+# The helpers below are what instrumented code calls. With collection disabled
+# each is a global lookup and a None check.
+
+def phase(name):
+    registry = _registry
+    if registry is None:
+        return _null_phase
+    return registry.phase(name)
+
+
+def count(name, value=1):
+    registry = _registry
+    if registry is not None:
+        registry.count(name, value)
+
+
+def observe(name, value):
+    registry = _registry
+    if registry is not None:
+        registry.observe(name, value)
+
+
+class Capture:
+    def __init__(self):
+        self.profile = None
+        self.memory = None
+        self.peak_memory = None
+
+    def report(self, limit=25):
+        out = io.StringIO()
+        if self.profile is not None:
+            pstats.Stats(self.profile, stream=out).sort_stats('cumulative').print_stats(limit)
+        if self.memory is not None:
+            out.write(f"Peak traced memory: {self.peak_memory} bytes\n")
+            for stat in self.memory.statistics('lineno')[:limit]:
+                out.write(f"{stat}\n")
+        return out.getvalue()
+
+
+@contextlib.contextmanager
+def capture(profile=True, trace_memory=False, profile_path=None):
+    """Run the enclosed block under cProfile and/or tracemalloc.
+
+    Yields a Capture whose profile/memory fields are filled in when the block
+    exits; profile_path also dumps the raw profile for snakeviz/pstats.
+    """
+    result = Capture()
+    profiler = cProfile.Profile() if profile else None
+    started_tracing = trace_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield result
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            result.profile = profiler
+            if profile_path is not None:
+                profiler.dump_stats(profile_path)
+        if trace_memory:
+            result.memory = tracemalloc.take_snapshot()
+            result.peak_memory = tracemalloc.get_traced_memory()[1]
+            if started_tracing:
+                tracemalloc.stop()
+
+
+def profile_call(function, *args, profile=True, trace_memory=False, profile_path=None, **kwargs):
+    """Call function(*args, **kwargs) under capture() and return (result, Capture)."""
+    with capture(profile, trace_memory, profile_path) as result:
+        value = function(*args, **kwargs)
+    return value, result
@@ -0,0 +1,108 @@
+import re
+import fnmatch
+from collections import deque
+
+# Backreferences and conditional groups address groups by number or name, which
+# the combined prefilter would renumber or duplicate
+_GROUP_REFERENCE = re.compile(r'\\[1-9]|\(\?P=|\(\?\(')
+
+
+class AhoCorasick:
+    """Aho-Corasick automaton reporting which of many literals occur in a text."""
+
+    def __init__(self, words):
+        self.words = list(words)
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [set()]
+
+        for word_id, word in enumerate(self.words):
+            state = 0
+            for char in word:
+                next_state = self.goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][char] = next_state
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append(set())
+                state = next_state
+            self.output[state].add(word_id)
+
+        pending = deque(self.goto[0].values())
+        while pending:
+            state = pending.popleft()
+            for char, next_state in self.goto[state].items():
+                pending.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(char, 0)
+                if self.fail[next_state] == next_state:
+                    self.fail[next_state] = 0
+                self.output[next_state] |= self.output[self.fail[next_state]]
+
+    def find_all(self, text):
+        found = set()
+        state = 0
+        goto = self.goto
+        fail = self.fail
+        output = self.output
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found |= output[state]
+        return found
+
+
+class PatternSet:
+    """Many literal terms, globs and regexes evaluated against a name in one pass.
+
+    Literals go through a single Aho-Corasick automaton; globs and regexes are
+    combined into one alternation that acts as a prefilter, and only names it
+    accepts are checked against the individual expressions to attribute matches.
+    Regexes that refer back to their own groups are tested directly instead.
+    """
+
+    def __init__(self, terms=(), globs=(), regexes=(), case_sensitive=False):
+        self.case_sensitive = case_sensitive
+        flags = 0 if case_sensitive else re.IGNORECASE
+
+        self.terms = list(dict.fromkeys(terms))
+        self.automaton = AhoCorasick(term if case_sensitive else term.lower() for term in self.terms)
+
+        self.expressions = []
+        for glob in dict.fromkeys(globs):
+            self.expressions.append((glob, re.compile(fnmatch.translate(glob), flags), True))
+        for regex in dict.fromkeys(regexes):
+            self.expressions.append((regex, re.compile(regex, flags), False))
+
+        self.prefilter = None
+        if len(self.expressions) > 1 and not any(_GROUP_REFERENCE.search(regex) for regex in regexes):
+            parts = [
+                f"(?:^(?:{compiled.pattern}))" if anchored else f"(?:{compiled.pattern})"
+                for _, compiled, anchored in self.expressions
+            ]
+            try:
+                self.prefilter = re.compile('|'.join(parts), flags)
+            except re.error:
+                # e.g. inline global flags inside one of the regexes
+                self.prefilter = None
+
+    @property
+    def patterns(self):
+        return self.terms + [pattern for pattern, _, _ in self.expressions]
+
+    def match(self, name):
+        matched = []
+        if self.terms:
+            text = name if self.case_sensitive else name.lower()
+            for word_id in sorted(self.automaton.find_all(text)):
+                matched.append(self.terms[word_id])
+        if self.expressions and (self.prefilter is None or self.prefilter.search(name)):
+            for pattern, compiled, anchored in self.expressions:
+                if (compiled.match(name) if anchored else compiled.search(name)):
+                    matched.append(pattern)
+        return matched
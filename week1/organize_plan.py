@@ -0,0 +1,306 @@
+import os
+import time
+import logging
+from collections import namedtuple
+
+import metrics
+from copy_executor import ERRORS_KEY
+from dedupe import full_hash
+from transfer import TRANSFER_MODES, resolve_transfer_mode
+
+logger = logging.getLogger(__name__)
+
+COLLISION_POLICIES = ('rename', 'skip', 'overwrite')
+
+PlannedTransfer = namedtuple('PlannedTransfer', ['category', 'source', 'destination', 'mode', 'size', 'locality'])
+PlannedLink = namedtuple('PlannedLink', ['category', 'source', 'destination', 'mode', 'canonical'])
+CompletedTransfer = namedtuple('CompletedTransfer', ['category', 'source', 'destination', 'size'])
+
+
+class OrganizePlan:
+    """Everything an organize run will do, computed without writing to the target.
+
+    directories lists the missing directories parents-first, transfers the
+    copy/move/link operations, links the hardlinks to duplicates that are
+    made once their canonical file has been transferred, completed the
+    transfers a resumed run found already done, and skipped the
+    (source, reason) pairs that will not be touched.
+    """
+
+    def __init__(self, target_dir):
+        self.target_dir = target_dir
+        self.directories = []
+        self.transfers = []
+        self.links = []
+        self.completed = []
+        self.skipped = []
+        self.renamed = 0
+        self.total_bytes = 0
+        self.completed_bytes = 0
+
+    def __len__(self):
+        return len(self.transfers) + len(self.links)
+
+    def summary(self):
+        return {
+            'target_dir': self.target_dir,
+            'directories': len(self.directories),
+            'transfers': len(self.transfers),
+            'links': len(self.links),
+            'completed': len(self.completed),
+            'skipped': len(self.skipped),
+            'renamed': self.renamed,
+            'total_bytes': self.total_bytes,
+            'completed_bytes': self.completed_bytes,
+        }
+
+    def __repr__(self):
+        return f"OrganizePlan({self.summary()})"
+
+
+def _renamed(name):
+    stem, ext = os.path.splitext(name)
+    counter = 1
+    while True:
+        yield f"{stem}_{counter}{ext}"
+        counter += 1
+
+
+def _already_transferred(entry, destination, verify_hash):
+    try:
+        stats = os.stat(destination)
+    except OSError:
+        return False
+    if stats.st_size != entry.size:
+        return False
+    # Every transfer mode keeps the source mtime (copies go through copystat)
+    if stats.st_mtime == entry.mtime:
+        return True
+    return verify_hash and full_hash(destination) == full_hash(entry.path)
+
+
+class _TargetDirectory:
+    __slots__ = ('dev', 'names', 'planned')
+
+    def __init__(self, dev, names):
+        self.dev = dev
+        self.names = names
+        self.planned = set()
+
+
+def build_plan(entries, target_dir, categorize, transfer_mode='auto', duplicate_of=None, duplicates=None,
+               on_collision='rename', resume=False, journaled=None):
+    """Plan an organize run over FileEntry objects.
+
+    categorize maps an entry to its category directory (None to leave the
+    file alone), or is a sequence of such categories aligned with entries.
+    Each destination directory is inspected once: a single listdir to learn
+    which names are taken and a stat for its device (or its nearest existing
+    ancestor's, if it still has to be created).
+
+    A file whose destination already exists with the same size and mtime
+    (e.g. from an earlier run into the same target) is counted as completed
+    unless it is being moved. Any other collision is resolved per
+    on_collision: 'rename' picks the first free name_N (or an existing
+    name_N that is already an identical copy, so re-runs stay idempotent),
+    'skip' leaves the file alone and 'overwrite' replaces the destination.
+
+    With resume, a file whose destination (the one recorded for it in the
+    journaled {source: destination} map, or else its plain name) already has
+    the same size and mtime is counted as completed instead of being renamed
+    and copied again; resume='hash' also accepts an equal sha256.
+    """
+    if transfer_mode not in TRANSFER_MODES:
+        raise ValueError(f"Invalid transfer mode: {transfer_mode}")
+    if on_collision not in COLLISION_POLICIES:
+        raise ValueError(f"Invalid collision policy: {on_collision}")
+    duplicate_of = duplicate_of or {}
+    journaled = journaled or {}
+
+    target_dir = os.path.abspath(target_dir)
+    plan = OrganizePlan(target_dir)
+    targets = {}
+    missing = set()
+
+    def inspect(directory):
+        target = targets.get(directory)
+        if target is not None:
+            return target
+        try:
+            target = _TargetDirectory(os.stat(directory).st_dev, set(os.listdir(directory)))
+        except FileNotFoundError:
+            missing.add(directory)
+            parent = os.path.dirname(directory)
+            target = _TargetDirectory(inspect(parent).dev if parent != directory else None, set())
+        targets[directory] = target
+        return target
+
+    labels = None if callable(categorize) else iter(categorize)
+    for entry in entries:
+        category = categorize(entry) if labels is None else next(labels)
+        if category is None:
+            continue
+        category_dir = os.path.join(target_dir, category)
+        target = inspect(category_dir)
+        destination = os.path.join(category_dir, entry.name)
+
+        if destination == os.path.abspath(entry.path):
+            plan.skipped.append((entry.path, 'already in place'))
+            continue
+        canonical = duplicate_of.get(entry.path)
+        if canonical is not None and duplicates != 'hardlink':
+            plan.skipped.append((entry.path, f"duplicate of {canonical}"))
+            continue
+        if resume:
+            previous = journaled.get(entry.path)
+            if previous is None or os.path.dirname(previous) != category_dir:
+                previous = destination
+            taken = os.path.basename(previous) in target.names
+            if taken and _already_transferred(entry, previous, resume == 'hash'):
+                target.planned.add(os.path.basename(previous))
+                plan.completed.append(CompletedTransfer(category, entry.path, previous, entry.size))
+                plan.completed_bytes += entry.size
+                continue
+        mode = resolve_transfer_mode(transfer_mode, entry.dev, target.dev)
+        # Only an existing file left by an earlier run can be an identical copy
+        reusable = mode != 'move' and canonical is None
+
+        def identical(name):
+            return (name not in target.planned and reusable
+                    and _already_transferred(entry, os.path.join(category_dir, name), False))
+
+        name = entry.name
+        if name in target.names:
+            if on_collision == 'skip':
+                plan.skipped.append((entry.path, f"{destination} exists"))
+                continue
+            done = identical(name)
+            if not done and on_collision == 'rename':
+                for name in _renamed(entry.name):
+                    if name not in target.names:
+                        plan.renamed += 1
+                        break
+                    if identical(name):
+                        done = True
+                        break
+                destination = os.path.join(category_dir, name)
+            if done:
+                target.planned.add(name)
+                plan.completed.append(CompletedTransfer(category, entry.path, destination, entry.size))
+                plan.completed_bytes += entry.size
+                continue
+        target.names.add(name)
+        target.planned.add(name)
+
+        if canonical is not None:
+            plan.links.append(PlannedLink(category, entry.path, destination, mode, canonical))
+            continue
+        plan.transfers.append(PlannedTransfer(category, entry.path, destination, mode, entry.size,
+                                              (entry.dev, entry.inode)))
+        plan.total_bytes += entry.size
+
+    plan.directories = sorted(missing)
+    logger.info(
+        "Planned %d transfers (%d bytes) and %d links into %s: %d directories to create, %d renamed, "
+        "%d already done, %d skipped",
+        len(plan.transfers), plan.total_bytes, len(plan.links), target_dir, len(plan.directories),
+        plan.renamed, len(plan.completed), len(plan.skipped)
+    )
+    return plan
+
+
+def create_directories(plan):
+    """Create the plan's missing directories, parents first, with one mkdir each."""
+    with metrics.phase('mkdir'):
+        for directory in plan.directories:
+            try:
+                os.mkdir(directory)
+            except FileExistsError:
+                pass
+    metrics.count('directories_created', len(plan.directories))
+    if plan.directories:
+        logger.debug("Created %d directories under %s", len(plan.directories), plan.target_dir)
+
+
+def transfer_jobs(plan):
+    """(category, source, destination, mode) jobs for the plan's transfers, in (device, inode) order."""
+    transfers = sorted(plan.transfers, key=lambda transfer: transfer.locality)
+    return ((transfer.category, transfer.source, transfer.destination, transfer.mode) for transfer in transfers)
+
+
+def link_jobs(plan, failed=()):
+    """One job per plan.links entry, in order, to run once the transfers are done.
+
+    A duplicate is hardlinked to its canonical file's new destination, or
+    transferred on its own if that transfer failed (its source is in failed).
+    """
+    planned = {transfer.source: transfer.destination for transfer in plan.transfers}
+    planned.update((completed.source, completed.destination) for completed in plan.completed)
+    for link in plan.links:
+        if link.canonical in planned and link.canonical not in failed:
+            yield link.category, planned[link.canonical], link.destination, 'hardlink'
+        else:
+            yield link.category, link.source, link.destination, link.mode
+
+
+def apply_plan(plan, executor, journal=None, progress=None):
+    """Execute a plan and return {category: [destinations]}, with failures under ERRORS_KEY.
+
+    All missing directories are created up front, parents first, with one
+    mkdir each. Transfers run in (device, inode) order of their sources, which
+    roughly follows on-disk layout, so spinning disks read sequentially.
+
+    Each finished operation is appended to journal (an open RunJournal) as
+    [source, destination], and progress is called as
+    progress(done_files, total_files, done_bytes, total_bytes), counting the
+    operations a resumed plan found already completed.
+    """
+    started = time.perf_counter()
+    sizes = {transfer.source: transfer.size for transfer in plan.transfers}
+    # A duplicate's link job reads from its canonical file's destination; the
+    # journal must name the duplicate itself so a resumed plan can match it
+    link_sources = {link.destination: link.source for link in plan.links}
+    counters = {
+        'files': len(plan.completed),
+        'bytes': plan.completed_bytes,
+        'total_files': len(plan.completed) + len(plan),
+        'total_bytes': plan.completed_bytes + plan.total_bytes,
+    }
+
+    def on_done(key, source, destination, error):
+        size = sizes.get(source, 0)
+        counters['files'] += 1
+        counters['bytes'] += size
+        if error is None:
+            metrics.count('files_transferred')
+            metrics.count('bytes_transferred', size)
+        if error is None and journal is not None:
+            journal.append(os.fspath(link_sources.get(destination, source)), destination)
+        if progress is not None:
+            progress(counters['files'], counters['total_files'], counters['bytes'], counters['total_bytes'])
+
+    create_directories(plan)
+    with metrics.phase('copy'):
+        results, errors = executor.run(transfer_jobs(plan), on_done)
+
+    if plan.links:
+        failed = {src for src, _ in errors}
+        with metrics.phase('copy'):
+            linked, link_errors = executor.run(link_jobs(plan, failed), on_done)
+        for category, dest_files in linked.items():
+            results.setdefault(category, []).extend(dest_files)
+        errors.extend(link_errors)
+
+    for completed in plan.completed:
+        results.setdefault(completed.category, []).append(completed.destination)
+    if journal is not None:
+        journal.sync()
+
+    logger.info(
+        "Organized %d files (%d bytes, %d already done) into %d categories under %s in %.2fs, %d errors",
+        sum(len(dest_files) for dest_files in results.values()), plan.total_bytes, len(plan.completed),
+        len(results), plan.target_dir, time.perf_counter() - started, len(errors)
+    )
+    if errors:
+        results[ERRORS_KEY] = errors
+    return results
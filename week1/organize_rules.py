@@ -0,0 +1,133 @@
+import os
+import re
+import bisect
+import string
+import datetime
+
+SIZE_THRESHOLDS = [
+    10 * 1024,  # tiny: 0 - 10 KB
+    1 * 1024 * 1024,  # small: 10 KB - 1 MB
+    100 * 1024 * 1024,  # medium: 1 MB - 100 MB
+    1 * 1024 * 1024 * 1024,  # large: 100 MB - 1 GB
+]
+SIZE_BUCKETS = ['tiny', 'small', 'medium', 'large', 'huge']
+
+TEMPLATE_FIELDS = ('ext', 'name', 'stem', 'size', 'size_bucket', 'mtime', 'ctime', 'atime')
+
+_formatter = string.Formatter()
+
+
+def size_bucket(size):
+    return SIZE_BUCKETS[bisect.bisect_right(SIZE_THRESHOLDS, size)]
+
+
+def _timestamp(value):
+    if value is None or isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        value = datetime.datetime.fromisoformat(value)
+    return value.timestamp()
+
+
+class Rule:
+    """One organizing rule: predicates a file must satisfy and where it goes.
+
+    destination is a str.format template relative to the target directory,
+    e.g. '{ext}/{mtime:%Y-%m}/{size_bucket}'. Available fields are ext (without
+    the dot, 'no_extension' if there is none), name, stem, size, size_bucket
+    and the mtime/ctime/atime datetimes. Every predicate left as None matches.
+    """
+
+    def __init__(self, destination, extensions=None, min_size=None, max_size=None,
+                 modified_after=None, modified_before=None, name_regex=None):
+        self.destination = destination
+        self.fields = set()
+        for _, field_name, _, _ in _formatter.parse(destination):
+            if field_name is None:
+                continue
+            field = re.match(r'\w*', field_name).group()
+            if field not in TEMPLATE_FIELDS:
+                raise ValueError(f"Unknown field '{field}' in destination template: {destination}")
+            self.fields.add(field)
+
+        if extensions is not None:
+            extensions = {ext.lower() if ext.startswith('.') else '.' + ext.lower() for ext in extensions}
+        self.extensions = extensions
+        self.min_size = min_size
+        self.max_size = max_size
+        self.modified_after = _timestamp(modified_after)
+        self.modified_before = _timestamp(modified_before)
+        self.name_regex = re.compile(name_regex) if name_regex is not None else None
+        # Filled in by RuleSet: the size slots (see RuleSet.size_slot) this rule accepts
+        self.size_slots = None
+
+    @classmethod
+    def from_spec(cls, spec):
+        return spec if isinstance(spec, cls) else cls(**spec)
+
+    def matches(self, entry, extension, size_slot):
+        if self.extensions is not None and extension not in self.extensions:
+            return False
+        if self.size_slots is not None and size_slot not in self.size_slots:
+            return False
+        if self.modified_after is not None and entry.mtime < self.modified_after:
+            return False
+        if self.modified_before is not None and entry.mtime >= self.modified_before:
+            return False
+        if self.name_regex is not None and not self.name_regex.search(entry.name):
+            return False
+        return True
+
+
+class RuleSet:
+    """An ordered list of rules evaluated in a single pass; the first match wins.
+
+    The size bounds of every rule are merged into one sorted threshold list,
+    so each file's size is located with a single bisect and every size range
+    check becomes a set lookup on the resulting slot.
+    """
+
+    def __init__(self, rules):
+        self.rules = [Rule.from_spec(rule) for rule in rules]
+        self.thresholds = sorted({
+            bound for rule in self.rules for bound in (rule.min_size, rule.max_size) if bound is not None
+        })
+        for rule in self.rules:
+            if rule.min_size is None and rule.max_size is None:
+                continue
+            low = 0 if rule.min_size is None else self.size_slot(rule.min_size)
+            high = len(self.thresholds) + 1 if rule.max_size is None else self.size_slot(rule.max_size)
+            rule.size_slots = set(range(low, high))
+
+    def size_slot(self, size):
+        return bisect.bisect_right(self.thresholds, size)
+
+    def destination(self, entry):
+        extension = os.path.splitext(entry.name)[1].lower()
+        size_slot = self.size_slot(entry.size) if self.thresholds else 0
+        for rule in self.rules:
+            if rule.matches(entry, extension, size_slot):
+                return self._render(rule, entry, extension)
+        return None
+
+    def _render(self, rule, entry, extension):
+        values = {}
+        fields = rule.fields
+        if 'ext' in fields:
+            values['ext'] = extension[1:] if extension else 'no_extension'
+        if 'name' in fields:
+            values['name'] = entry.name
+        if 'stem' in fields:
+            values['stem'] = os.path.splitext(entry.name)[0]
+        if 'size' in fields:
+            values['size'] = entry.size
+        if 'size_bucket' in fields:
+            values['size_bucket'] = size_bucket(entry.size)
+        for field in ('mtime', 'ctime', 'atime'):
+            if field in fields:
+                values[field] = datetime.datetime.fromtimestamp(getattr(entry, field))
+
+        destination = os.path.normpath(rule.destination.format(**values))
+        if os.path.isabs(destination) or destination.split(os.sep)[0] == os.pardir:
+            raise ValueError(f"Destination escapes the target directory: {destination}")
+        return destination
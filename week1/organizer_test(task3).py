@@ -4,9 +4,14 @@ import time
 import random
 import string
 from file_organizer import FileOrganizer
+from logging_config import configure_logging
 
-def create_test_environment(test_dir="test_files"):
-    """Create a test directory with sample files of different types and sizes."""
+def create_test_environment(test_dir="test_files", seed=None):
+    """Create a test directory with sample files of different types and sizes.
+
+    Pass a seed to get the same files on every run; synthetic_tree.SyntheticTree
+    generates larger trees for benchmarking.
+    """
     print(f"Creating test environment in '{test_dir}'...")
     
     # Remove test directory if it exists
@@ -30,6 +35,7 @@ def create_test_environment(test_dir="test_files"):
         "py": ["script", "module", "test"]
     }
     
+    rng = random.Random(seed)
     created_files = []
     
     # Create files with various sizes and dates
@@ -40,18 +46,18 @@ def create_test_environment(test_dir="test_files"):
             filepath = os.path.join(test_dir, filename)
             
             # Create files with random content and sizes (100B to 10KB)
-            size = random.randint(100, 10240)
+            size = rng.randint(100, 10240)
             with open(filepath, 'wb') as f:
-                f.write(os.urandom(size))
+                f.write(rng.randbytes(size))
             
             created_files.append(filepath)
             
             # Create some files in subdirectories
-            if random.choice([True, False]):
-                subdir = random.choice(["docs", "images"])
+            if rng.choice([True, False]):
+                subdir = rng.choice(["docs", "images"])
                 subpath = os.path.join(test_dir, subdir, f"{prefix}_{subdir}.{ext}")
                 with open(subpath, 'wb') as f:
-                    f.write(os.urandom(size))
+                    f.write(rng.randbytes(size))
                 created_files.append(subpath)
     
     # Create a few files with older modification times
@@ -62,7 +68,7 @@ def create_test_environment(test_dir="test_files"):
             f.write(f"This is an older file {i}")
         
         # Set modification time to random time in past (1-30 days ago)
-        days_ago = random.randint(1, 30)
+        days_ago = rng.randint(1, 30)
         past_time = time.time() - (days_ago * 86400)  # 86400 seconds in a day
         os.utime(filepath, (past_time, past_time))
         
@@ -172,4 +178,5 @@ def test_file_organizer():
     print("\n-------- All tests completed --------")
 
 if __name__ == "__main__":
+    configure_logging()
     test_file_organizer()
\ No newline at end of file
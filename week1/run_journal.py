@@ -0,0 +1,76 @@
+import os
+import json
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class RunJournal:
+    """Append-only log of completed operations, one JSON array per line.
+
+    Records are written through immediately but only fsync'ed every
+    sync_every records or sync_interval seconds, so a crash loses at most
+    that much progress and the operations behind it are simply redone. A
+    line torn by the crash is ignored when the journal is read back.
+    """
+
+    def __init__(self, path, sync_every=256, sync_interval=1.0):
+        self.path = path
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self._file = None
+        self._unsynced = 0
+        self._last_sync = 0.0
+
+    @staticmethod
+    def read(path):
+        records = []
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        continue
+        except FileNotFoundError:
+            pass
+        return records
+
+    def open(self, truncate=False):
+        self._file = open(self.path, 'w' if truncate else 'a', encoding='utf-8')
+        self._last_sync = time.monotonic()
+        return self
+
+    def append(self, *record):
+        self._file.write(json.dumps(record) + '\n')
+        self._unsynced += 1
+        if self._unsynced >= self.sync_every or time.monotonic() - self._last_sync >= self.sync_interval:
+            self.sync()
+
+    def sync(self):
+        if self._file is None or not self._unsynced:
+            return
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def close(self):
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+            self._file = None
+
+    def remove(self):
+        self.close()
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
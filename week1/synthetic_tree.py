@@ -0,0 +1,144 @@
+import os
+import csv
+import json
+import math
+import random
+import logging
+import datetime
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EXTENSIONS = {
+    'txt': 30, 'log': 10, 'csv': 8, 'json': 8, 'py': 10,
+    'jpg': 15, 'png': 6, 'pdf': 6, 'zip': 2, '': 5,
+}
+
+CONTENT_BLOCK = 1024 * 1024
+WRITE_CHUNK = 1024 * 1024
+
+CITIES = ['New York', 'Los Angeles', 'Chicago', 'Houston', 'Phoenix', 'Seattle', 'Boston', 'Denver']
+FIRST_NAMES = ['John', 'Jane', 'Emily', 'Michael', 'Sarah', 'David', 'Laura', 'James', 'Anna', 'Robert']
+LAST_NAMES = ['Doe', 'Smith', 'Johnson', 'Brown', 'Davis', 'Miller', 'Wilson', 'Moore', 'Taylor', 'Clark']
+
+
+class SyntheticTree:
+    """Reproducible directory tree of arbitrary size for benchmarks.
+
+    Every choice comes from random.Random(seed), so the same arguments always
+    produce the same names, sizes, timestamps and contents. Directories form
+    a tree of the given depth and fan_out; files are spread over all of them.
+    Sizes are log-normal around median_size (capped at max_size), extensions
+    are drawn from a weighted mix, and duplicate_ratio of the files repeat the
+    contents of an earlier file. Contents are slices of one seeded random
+    block, so writing a file costs no more than the write itself.
+    """
+
+    def __init__(self, files=1000, depth=3, fan_out=8, median_size=4096, size_sigma=1.5, max_size=64 * 1024 * 1024,
+                 extensions=None, duplicate_ratio=0.05, seed=0, start=None, end=None):
+        self.files = files
+        self.depth = depth
+        self.fan_out = fan_out
+        self.median_size = median_size
+        self.size_sigma = size_sigma
+        self.max_size = max_size
+        self.extensions = extensions if extensions is not None else DEFAULT_EXTENSIONS
+        self.duplicate_ratio = duplicate_ratio
+        self.seed = seed
+        now = datetime.datetime(2024, 1, 1).timestamp()
+        self.start = start if start is not None else now - 3 * 365 * 86400
+        self.end = end if end is not None else now
+
+    def _directories(self, root):
+        directories = [root]
+        level = [root]
+        for depth in range(self.depth):
+            level = [os.path.join(parent, f"dir{depth}_{child}") for parent in level for child in range(self.fan_out)]
+            directories.extend(level)
+        return directories
+
+    def _write(self, path, size, offset, block):
+        with open(path, 'wb') as f:
+            view = memoryview(block)
+            written = 0
+            while written < size:
+                start = (offset + written) % CONTENT_BLOCK
+                count = min(size - written, CONTENT_BLOCK - start, WRITE_CHUNK)
+                f.write(view[start:start + count])
+                written += count
+
+    def generate(self, root):
+        """Create the tree below root (which must not exist yet) and return a summary dict."""
+        rng = random.Random(self.seed)
+        block = rng.randbytes(CONTENT_BLOCK)
+        names, weights = zip(*self.extensions.items())
+        mu = math.log(self.median_size)
+
+        directories = self._directories(os.path.abspath(root))
+        for directory in directories:
+            os.makedirs(directory)
+
+        recipes = []
+        total_bytes = 0
+        duplicates = 0
+        for number in range(self.files):
+            if recipes and rng.random() < self.duplicate_ratio:
+                size, offset = recipes[rng.randrange(len(recipes))]
+                duplicates += 1
+            else:
+                size = min(int(rng.lognormvariate(mu, self.size_sigma)), self.max_size)
+                offset = rng.randrange(CONTENT_BLOCK)
+                # Bounded so memory stays flat for millions of files
+                if len(recipes) < 4096:
+                    recipes.append((size, offset))
+                else:
+                    recipes[rng.randrange(len(recipes))] = (size, offset)
+
+            extension = rng.choices(names, weights)[0]
+            name = f"file{number:07d}" + (f".{extension}" if extension else '')
+            path = os.path.join(rng.choice(directories), name)
+            self._write(path, size, offset, block)
+            timestamp = rng.uniform(self.start, self.end)
+            os.utime(path, (timestamp, timestamp))
+            total_bytes += size
+
+        logger.info("Generated %d files (%d bytes, %d duplicates) in %d directories under %s",
+                    self.files, total_bytes, duplicates, len(directories), root)
+        return {
+            'root': os.path.abspath(root),
+            'files': self.files,
+            'bytes': total_bytes,
+            'directories': len(directories),
+            'duplicates': duplicates,
+            'seed': self.seed,
+        }
+
+
+def _people(rows, seed):
+    rng = random.Random(seed)
+    for number in range(1, rows + 1):
+        yield {
+            'id': number,
+            'name': f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            'age': rng.randint(18, 80),
+            'city': rng.choice(CITIES),
+            'score': rng.randint(0, 100),
+        }
+
+
+def generate_csv(path, rows=100000, seed=0):
+    """Write a data.csv-shaped file (id, name, age, city, score) with rows seeded records."""
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=['id', 'name', 'age', 'city', 'score'])
+        writer.writeheader()
+        writer.writerows(_people(rows, seed))
+    return path
+
+
+def generate_json(path, records=100000, seed=0):
+    """Write a data.json-shaped file: a JSON array of seeded person records."""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('[\n')
+        for number, record in enumerate(_people(records, seed)):
+            f.write((',\n' if number else '') + json.dumps(record))
+        f.write('\n]\n')
+    return path
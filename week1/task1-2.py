@@ -2,6 +2,12 @@ import os
 import shutil
 import csv
 import json
+import bisect
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 def read_file(file_path):
     try:
@@ -53,6 +59,129 @@ def parse_csv(file_path):
         print(f"Error reading CSV file. \n Details: {e}")
         return []
 
+def _csv_columns(header, columns):
+    if columns is None:
+        return list(enumerate(header))
+    positions = {name: index for index, name in enumerate(header)}
+    missing = [name for name in columns if name not in positions]
+    if missing:
+        raise KeyError(f"Unknown CSV columns: {', '.join(missing)}")
+    return [(positions[name], name) for name in columns]
+
+
+def _csv_selection(file_path, columns):
+    """Read the header and resolve columns before any streaming starts.
+
+    Returns None when the file is missing, unreadable or empty; an unknown
+    column raises KeyError to the caller instead of ending the stream.
+    """
+    if not os.path.exists(file_path):
+        print(f"File {file_path} does not exist.")
+        return None
+    try:
+        with open(file_path, mode='r', encoding='utf-8', newline='') as file:
+            header = next(csv.reader(file), None)
+    except (OSError, UnicodeDecodeError, csv.Error) as e:
+        print(f"Error reading CSV file. \n Details: {e}")
+        return None
+    if header is None:
+        return None
+    return _csv_columns(header, columns)
+
+
+def _coerce(value, convert, strict=False, name=None):
+    if convert is None:
+        return value
+    try:
+        return convert(value)
+    except (TypeError, ValueError) as e:
+        if strict:
+            column = f" in column {name!r}" if name is not None else ''
+            raise ValueError(f"Cannot convert {value!r}{column}: {e}") from e
+        return None
+
+
+def _csv_rows(file_path):
+    with open(file_path, mode='r', encoding='utf-8', newline='') as file:
+        reader = csv.reader(file)
+        next(reader, None)
+        yield from reader
+
+
+def iter_csv(file_path, columns=None, types=None, strict=False):
+    """Stream rows as dicts, optionally projected to columns and converted by types.
+
+    Unparsable values become None unless strict is set, which raises ValueError.
+    """
+    selected = _csv_selection(file_path, columns)
+    if selected is None:
+        return iter(())
+    types = types or {}
+    return _iter_csv(file_path, [(index, name, types.get(name)) for index, name in selected], strict)
+
+
+def _iter_csv(file_path, selected, strict):
+    try:
+        for row in _csv_rows(file_path):
+            yield {
+                name: _coerce(row[index], convert, strict, name) if index < len(row) else None
+                for index, name, convert in selected
+            }
+    except (OSError, UnicodeDecodeError, csv.Error) as e:
+        print(f"Error reading CSV file. \n Details: {e}")
+
+
+def iter_csv_batches(file_path, batch_size=1000, columns=None, types=None, strict=False):
+    return _batched(iter_csv(file_path, columns, types, strict), batch_size)
+
+
+def _batched(rows, batch_size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def iter_csv_columns(file_path, batch_size=10000, columns=None, types=None, use_numpy=True, strict=False):
+    selected = _csv_selection(file_path, columns)
+    if selected is None:
+        return iter(())
+    return _iter_csv_columns(file_path, batch_size, selected, types or {}, use_numpy, strict)
+
+
+def _iter_csv_columns(file_path, batch_size, selected, types, use_numpy, strict):
+    try:
+        batch = {name: [] for _, name in selected}
+        size = 0
+        for row in _csv_rows(file_path):
+            for index, name in selected:
+                batch[name].append(row[index] if index < len(row) else None)
+            size += 1
+            if size >= batch_size:
+                yield _finish_columns(batch, types, use_numpy, strict)
+                batch = {name: [] for _, name in selected}
+                size = 0
+        if size:
+            yield _finish_columns(batch, types, use_numpy, strict)
+    except (OSError, UnicodeDecodeError, csv.Error) as e:
+        print(f"Error reading CSV file. \n Details: {e}")
+
+
+def _finish_columns(batch, types, use_numpy, strict=False):
+    for name, values in batch.items():
+        convert = types.get(name)
+        if convert is not None:
+            values = [None if value is None else _coerce(value, convert, strict, name) for value in values]
+        if use_numpy and numpy is not None and None not in values:
+            values = numpy.asarray(values)
+        batch[name] = values
+    return batch
+
+
 def process_json(file_path):
     if not os.path.exists(file_path):
         print(f"File {file_path} does not exist.")
@@ -66,9 +195,309 @@ def process_json(file_path):
     except IOError:
         print("IOError: Unable to read JSON file.")
 
-def filter_data(data, key, value):
+def _project(item, fields):
+    if fields is None or not isinstance(item, dict):
+        return item
+    return {field: item[field] for field in fields if field in item}
+
+
+class _JsonChunks:
+    def __init__(self, file, size):
+        self.file = file
+        self.size = size
+        self.buffer = ''
+        self.pos = 0
+        # Characters dropped from the front of the buffer, so offset + pos is the file position
+        self.offset = 0
+        self.eof = False
+
+    def more(self):
+        chunk = self.file.read(self.size)
+        self.eof = not chunk
+        self.offset += self.pos
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+
+    def skip(self, chars):
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in chars:
+                self.pos += 1
+            if self.pos < len(self.buffer) or self.eof:
+                return
+            self.more()
+
+    def peek(self):
+        return self.buffer[self.pos:self.pos + 1]
+
+
+_JSON_WHITESPACE = ' \t\r\n'
+
+
+def _json_value(stream, decoder, terminators, error):
+    while True:
+        try:
+            item, end = decoder.raw_decode(stream.buffer, stream.pos)
+        except json.JSONDecodeError as e:
+            if stream.eof:
+                raise error(e.msg, e.pos) from None
+            stream.more()
+            continue
+        # A value cut off by the end of the buffer (e.g. "3" of "3.5") may
+        # continue in the next chunk; complete values are followed by a separator
+        if not stream.eof and stream.buffer[end:end + 1] not in terminators:
+            stream.more()
+            continue
+        stream.pos = end
+        return item
+
+
+def iter_json(file_path, fields=None, lines=None, buffer_size=64 * 1024):
+    """Yield the elements of a top-level JSON array, or each value of a
+    JSON Lines file, reading buffer_size characters at a time. Malformed
+    or truncated input raises ValueError with the character offset in the
+    file, after the elements before it have been yielded."""
+    if not os.path.exists(file_path):
+        print(f"File {file_path} does not exist.")
+        return
+    decoder = json.JSONDecoder()
+    try:
+        with open(file_path, 'r', encoding='utf-8') as file:
+            stream = _JsonChunks(file, buffer_size)
+
+            def error(message, pos=None):
+                position = stream.offset + (stream.pos if pos is None else pos)
+                return ValueError(f"Invalid JSON in {file_path} at character {position}: {message}")
+
+            stream.skip(_JSON_WHITESPACE)
+            if lines is None:
+                lines = file_path.endswith(('.jsonl', '.ndjson')) or stream.peek() != '['
+
+            if lines:
+                terminators = (' ', '\t', '\r', '\n')
+                while True:
+                    stream.skip(_JSON_WHITESPACE)
+                    if not stream.peek():
+                        return
+                    yield _project(_json_value(stream, decoder, terminators, error), fields)
+
+            terminators = (' ', '\t', '\r', '\n', ',', ']')
+            stream.pos += 1
+            stream.skip(_JSON_WHITESPACE)
+            if stream.peek() == ']':
+                stream.pos += 1
+            else:
+                while True:
+                    if not stream.peek():
+                        raise error("expected a value before end of file")
+                    yield _project(_json_value(stream, decoder, terminators, error), fields)
+                    stream.skip(_JSON_WHITESPACE)
+                    head = stream.peek()
+                    if head == ']':
+                        stream.pos += 1
+                        break
+                    if head != ',':
+                        raise error("expected ',' or ']'" if head else "expected ']' before end of file")
+                    stream.pos += 1
+                    stream.skip(_JSON_WHITESPACE)
+            stream.skip(_JSON_WHITESPACE)
+            if stream.peek():
+                raise error("unexpected data after the closing ']'")
+    except IOError:
+        print("IOError: Unable to read JSON file.")
+
+_RANGE_OPS = ('<', '<=', '>', '>=', 'between')
+
+
+class Dataset:
+    """Columnar view over parsed records with lazily built per-column indexes.
+
+    Equality and 'in' lookups use a hash index (value -> row positions), range
+    lookups use a NumPy mask when the column converts to a numeric array and a
+    sorted index searched with bisect otherwise. Conditions are (key, op, value)
+    tuples; ('and', [...]) and ('or', [...]) combine them.
+
+    Values are compared as stored, so columns read from parse_csv (all
+    strings) need types={'age': int, ...} for numeric ranges; a range whose
+    bound cannot be compared with the column raises ValueError.
+    """
+
+    def __init__(self, columns, types=None):
+        types = types or {}
+        self.columns = {
+            name: [_coerce(value, types[name]) for value in values] if name in types else list(values)
+            for name, values in columns.items()
+        }
+        lengths = {len(values) for values in self.columns.values()}
+        if len(lengths) > 1:
+            raise ValueError("All columns must have the same length")
+        self.length = lengths.pop() if lengths else 0
+        self._hash_indexes = {}
+        self._sorted_indexes = {}
+        self._arrays = {}
+
+    @classmethod
+    def from_records(cls, records, types=None):
+        columns = {}
+        count = 0
+        for record in records:
+            for key in record:
+                if key not in columns:
+                    columns[key] = [None] * count
+            for key, values in columns.items():
+                values.append(record.get(key))
+            count += 1
+        return cls(columns, types)
+
+    @classmethod
+    def from_column_batches(cls, batches, types=None):
+        columns = {}
+        for batch in batches:
+            for name, values in batch.items():
+                columns.setdefault(name, []).extend(values.tolist() if hasattr(values, 'tolist') else values)
+        return cls(columns, types)
+
+    def __len__(self):
+        return self.length
+
+    def _hash_index(self, key):
+        index = self._hash_indexes.get(key)
+        if index is None:
+            index = {}
+            for position, value in enumerate(self.columns[key]):
+                index.setdefault(value, []).append(position)
+            self._hash_indexes[key] = index
+        return index
+
+    def _sorted_index(self, key):
+        index = self._sorted_indexes.get(key)
+        if index is None:
+            try:
+                pairs = sorted((value, position) for position, value in enumerate(self.columns[key])
+                               if value is not None)
+            except TypeError:
+                kinds = sorted({type(value).__name__ for value in self.columns[key] if value is not None})
+                raise ValueError(f"Column {key!r} mixes values that cannot be ordered ({', '.join(kinds)}); "
+                                 f"pass types= to coerce it") from None
+            index = ([value for value, _ in pairs], [position for _, position in pairs])
+            self._sorted_indexes[key] = index
+        return index
+
+    def _array(self, key):
+        if numpy is None:
+            return None
+        if key not in self._arrays:
+            array = None
+            values = self.columns[key]
+            if None not in values:
+                try:
+                    array = numpy.asarray(values)
+                except (TypeError, ValueError):
+                    array = None
+                if array is not None and array.dtype.kind not in 'iuf':
+                    array = None
+            self._arrays[key] = array
+        return self._arrays[key]
+
+    def _range(self, key, op, value):
+        try:
+            return self._range_positions(key, op, value)
+        except TypeError:
+            kinds = sorted({type(item).__name__ for item in self.columns[key] if item is not None})
+            raise ValueError(f"Cannot compare column {key!r} ({', '.join(kinds)}) with {value!r}; "
+                             f"pass types= to coerce the column") from None
+
+    def _range_positions(self, key, op, value):
+        array = self._array(key)
+        if array is not None:
+            if op == 'between':
+                mask = (array >= value[0]) & (array <= value[1])
+            elif op == '<':
+                mask = array < value
+            elif op == '<=':
+                mask = array <= value
+            elif op == '>':
+                mask = array > value
+            else:
+                mask = array >= value
+            return set(numpy.flatnonzero(mask).tolist())
+
+        values, positions = self._sorted_index(key)
+        if op == 'between':
+            start, stop = bisect.bisect_left(values, value[0]), bisect.bisect_right(values, value[1])
+        elif op == '<':
+            start, stop = 0, bisect.bisect_left(values, value)
+        elif op == '<=':
+            start, stop = 0, bisect.bisect_right(values, value)
+        elif op == '>':
+            start, stop = bisect.bisect_right(values, value), len(values)
+        else:
+            start, stop = bisect.bisect_left(values, value), len(values)
+        return set(positions[start:stop])
+
+    def _positions(self, condition):
+        head = condition[0]
+        if head in ('and', 'or'):
+            parts = [self._positions(part) for part in condition[1]]
+            if not parts:
+                return set(range(self.length)) if head == 'and' else set()
+            if head == 'and':
+                parts.sort(key=len)
+                return set.intersection(*parts)
+            return set.union(*parts)
+
+        key, op, value = condition
+        if key not in self.columns:
+            return set()
+        if op == '==':
+            return set(self._hash_index(key).get(value, ()))
+        if op == 'in':
+            index = self._hash_index(key)
+            return {position for item in value for position in index.get(item, ())}
+        if op == '!=':
+            return set(range(self.length)) - set(self._hash_index(key).get(value, ()))
+        if op in _RANGE_OPS:
+            return self._range(key, op, value)
+        raise ValueError(f"Invalid operator: {op}")
+
+    def positions(self, *conditions):
+        return sorted(self._positions(('and', list(conditions))))
+
+    def records(self, positions=None):
+        if positions is None:
+            positions = range(self.length)
+        names = list(self.columns)
+        return [{name: self.columns[name][position] for name in names} for position in positions]
+
+    def take(self, positions):
+        return Dataset({name: [values[position] for position in positions] for name, values in self.columns.items()})
+
+    def query(self, *conditions):
+        return self.records(self.positions(*conditions))
+
+    def filter(self, key, value):
+        return self.records(sorted(self._hash_index(key).get(value, ()))) if key in self.columns else []
+
+
+def filter_data(data, key, value, lazy=False):
+    if isinstance(data, Dataset):
+        return data.filter(key, value)
+    if isinstance(data, dict):
+        return filter_columns(data, key, value)
+    if lazy:
+        return (item for item in data if item.get(key) == value)
     return [item for item in data if item.get(key) == value]
 
+
+def filter_columns(columns, key, value):
+    column = columns[key]
+    if numpy is not None and isinstance(column, numpy.ndarray):
+        mask = column == value
+        return {name: values[mask] if isinstance(values, numpy.ndarray)
+                else [item for item, keep in zip(values, mask) if keep]
+                for name, values in columns.items()}
+    positions = [index for index, item in enumerate(column) if item == value]
+    return {name: [values[index] for index in positions] for name, values in columns.items()}
+
 def string_manipulation(text, operation):
     if operation == "lower":
         return text.lower()
@@ -92,7 +521,10 @@ if __name__ == "__main__":
     csv_file = os.path.join(script_dir, "data.csv")
     json_file = os.path.join(script_dir, "data.json")
     print(parse_csv(csv_file))
+    for batch in iter_csv_columns(csv_file, batch_size=2, types={'id': int, 'age': int, 'score': int}):
+        print(filter_data(batch, 'city', 'Chicago'))
     print(process_json(json_file))
+    print(list(filter_data(iter_json(json_file, fields=['name', 'city']), 'city', 'Chicago', lazy=True)))
     
     sample_text = "  Sample Text  "
     print(string_manipulation(sample_text, "strip"))
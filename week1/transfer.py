@@ -0,0 +1,114 @@
+import os
+import errno
+import shutil
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+TRANSFER_MODES = ('auto', 'copy', 'move', 'hardlink', 'symlink', 'reflink')
+
+# ioctl request number for FICLONE from <linux/fs.h>
+FICLONE = 0x40049409
+
+_FALLBACK_ERRNOS = {errno.EXDEV, errno.ENOSYS, errno.EOPNOTSUPP, errno.EINVAL, errno.ENOTTY, errno.EBADF}
+
+
+def resolve_transfer_mode(mode, source_dev, target_dev):
+    if mode not in TRANSFER_MODES:
+        raise ValueError(f"Invalid transfer mode: {mode}. Expected one of {', '.join(TRANSFER_MODES)}")
+    if mode != 'auto':
+        return mode
+    # A clone on the same filesystem has copy semantics but shares the data blocks
+    return 'reflink' if source_dev == target_dev else 'copy'
+
+
+def _kernel_copy(fsrc, fdst):
+    size = os.fstat(fsrc.fileno()).st_size
+    offset = 0
+
+    if hasattr(os, 'copy_file_range'):
+        try:
+            while offset < size:
+                sent = os.copy_file_range(fsrc.fileno(), fdst.fileno(), size - offset)
+                if sent == 0:
+                    break
+                offset += sent
+        except OSError as e:
+            if e.errno not in _FALLBACK_ERRNOS:
+                raise
+
+    if offset < size and hasattr(os, 'sendfile'):
+        try:
+            while offset < size:
+                sent = os.sendfile(fdst.fileno(), fsrc.fileno(), offset, size - offset)
+                if sent == 0:
+                    break
+                offset += sent
+        except OSError as e:
+            if e.errno not in _FALLBACK_ERRNOS:
+                raise
+
+    if offset < size:
+        fsrc.seek(offset)
+        fdst.seek(offset)
+        shutil.copyfileobj(fsrc, fdst)
+
+
+def reflink_file(src, dst):
+    with open(src, 'rb') as fsrc:
+        src_stat = os.fstat(fsrc.fileno())
+        try:
+            dst_stat = os.stat(dst)
+        except FileNotFoundError:
+            pass
+        else:
+            # Opening dst for writing would truncate src if both are the same inode
+            if (dst_stat.st_dev, dst_stat.st_ino) == (src_stat.st_dev, src_stat.st_ino):
+                raise shutil.SameFileError(f"{src!r} and {dst!r} are the same file")
+        with open(dst, 'wb') as fdst:
+            _clone_or_copy(fsrc, fdst)
+    shutil.copystat(src, dst)
+
+
+def _clone_or_copy(fsrc, fdst):
+    if fcntl is not None:
+        try:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+            return
+        except OSError as e:
+            if e.errno not in _FALLBACK_ERRNOS:
+                raise
+    _kernel_copy(fsrc, fdst)
+
+
+def _replace_with_link(dst, make_link):
+    tmp = f"{dst}.{os.getpid()}.{threading.get_ident()}.tmp"
+    make_link(tmp)
+    try:
+        os.replace(tmp, dst)
+    except OSError:
+        os.unlink(tmp)
+        raise
+
+
+def transfer_file(src, dst, mode='copy'):
+    src = os.fspath(src)
+    dst = os.fspath(dst)
+    if os.path.abspath(src) == os.path.abspath(dst):
+        raise shutil.SameFileError(f"{src!r} and {dst!r} are the same file")
+    if mode == 'copy':
+        shutil.copy2(src, dst)
+    elif mode == 'move':
+        shutil.move(src, dst)
+    elif mode == 'hardlink':
+        _replace_with_link(dst, lambda tmp: os.link(src, tmp))
+    elif mode == 'symlink':
+        _replace_with_link(dst, lambda tmp: os.symlink(os.path.abspath(src), tmp))
+    elif mode == 'reflink':
+        reflink_file(src, dst)
+    else:
+        raise ValueError(f"Invalid transfer mode: {mode}")
+    return dst
@@ -0,0 +1,118 @@
+import os
+import re
+import fnmatch
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from file_entry import FileEntry
+from file_index import is_index_file
+
+logger = logging.getLogger(__name__)
+
+SHARD_BUDGET = 256
+
+
+def glob_matcher(patterns):
+    if not patterns:
+        return None
+    return re.compile('|'.join(fnmatch.translate(pattern) for pattern in patterns)).match
+
+
+def _walk(stack, budget, max_depth, extensions, include, exclude_dirs, report):
+    """Yield the files of up to budget directories popped from stack, pushing their subdirectories.
+
+    stack holds (path, depth) pairs; whatever is left on it once the budget is
+    spent is the caller's to hand out again.
+    """
+    include_match = glob_matcher(include)
+    exclude_match = glob_matcher(exclude_dirs)
+    visited = 0
+    while stack and visited < budget:
+        directory, depth = stack.pop()
+        visited += 1
+        descend = max_depth is None or depth < max_depth
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    try:
+                        if entry.is_file():
+                            name = entry.name
+                            if is_index_file(name):
+                                continue
+                            if extensions is not None and os.path.splitext(name)[1].lower() not in extensions:
+                                continue
+                            if include_match is not None and not include_match(name):
+                                continue
+                            yield FileEntry.from_dir_entry(entry)
+                        elif descend and entry.is_dir(follow_symlinks=False):
+                            if exclude_match is not None and exclude_match(entry.name):
+                                continue
+                            stack.append((entry.path, depth + 1))
+                    except OSError as e:
+                        report(f"Skipping {entry.path}: {e}")
+        except OSError as e:
+            report(f"Unable to scan directory {directory}: {e}")
+
+
+def _walk_shard(shard, budget, max_depth, extensions, include, exclude_dirs):
+    errors = []
+    stack = list(shard)
+    entries = list(_walk(stack, budget, max_depth, extensions, include, exclude_dirs, errors.append))
+    return entries, stack, errors
+
+
+def walk_files(directory, workers=1, max_depth=None, extensions=None, include=None, exclude_dirs=None,
+               sort=False, use_processes=False, budget=SHARD_BUDGET):
+    """Yield a FileEntry for every file below directory, scanning subtrees in parallel.
+
+    With workers > 1 the tree is split into shards of directories that run on
+    a thread pool (os.scandir releases the GIL) or, with use_processes, a
+    process pool. A shard scans at most budget directories and returns the
+    subdirectories it has not reached, which go back on the shared frontier,
+    so one deep subtree ends up spread over every idle worker. Files are
+    yielded as shards finish, or sorted by path once the walk is done if sort
+    is set.
+
+    max_depth limits recursion (0 scans only directory itself); include is a
+    list of glob patterns file names must match and exclude_dirs a list of
+    glob patterns for directory names that are not descended into.
+    """
+    directory = os.path.abspath(directory)
+    if extensions is not None:
+        extensions = {ext.lower() if ext.startswith('.') else '.' + ext.lower() for ext in extensions}
+    options = (max_depth, extensions, include, exclude_dirs)
+
+    if sort:
+        yield from sorted(
+            walk_files(directory, workers, *options, use_processes=use_processes, budget=budget),
+            key=lambda entry: entry.path
+        )
+        return
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1:
+        yield from _walk([(directory, 0)], float('inf'), *options, logger.warning)
+        return
+
+    pool_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    frontier = deque([(directory, 0)])
+    scanned = 0
+    with pool_class(max_workers=workers) as pool:
+        in_flight = set()
+        while frontier or in_flight:
+            while frontier and len(in_flight) < workers * 2:
+                # Split the frontier evenly between the free slots, oldest (shallowest) directories first
+                share = max(1, len(frontier) // (workers * 2 - len(in_flight)))
+                shard = [frontier.popleft() for _ in range(min(share, len(frontier)))]
+                in_flight.add(pool.submit(_walk_shard, shard, budget, *options))
+            finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                entries, leftovers, errors = future.result()
+                for error in errors:
+                    logger.warning(error)
+                frontier.extend(leftovers)
+                scanned += len(entries)
+                yield from entries
+    logger.debug("Walked %s with %d workers: %d files", directory, workers, scanned)
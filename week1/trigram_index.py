@@ -0,0 +1,187 @@
+import os
+import sys
+import bisect
+import struct
+import logging
+from array import array
+
+logger = logging.getLogger(__name__)
+
+# Name of the FileIndex blob the organizer keeps the trigram index in
+TRIGRAM_BLOB = 'trigrams'
+
+_MAGIC = b'TRIGRAMS\x01'
+# complete flag, path count, path blob size, trigram count
+_HEADER = struct.Struct('<BIQI')
+# trigram key size, posting list length
+_POSTING = struct.Struct('<BI')
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _contains(sorted_ids, file_id):
+    position = bisect.bisect_left(sorted_ids, file_id)
+    return position < len(sorted_ids) and sorted_ids[position] == file_id
+
+
+class TrigramIndex:
+    """Inverted index from lower-cased filename trigrams to file ids.
+
+    A substring query of three or more characters only verifies the files
+    present in the posting lists of all of its trigrams. Ids are assigned in
+    increasing order, so every posting list stays sorted and intersections are
+    done by binary search from the shortest list. Removed files leave a
+    tombstone until the index is compacted.
+    """
+
+    def __init__(self):
+        self.paths = []
+        self.names = []
+        self.ids = {}
+        self.postings = {}
+        self.removed = 0
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, path):
+        if path in self.ids:
+            return
+        file_id = len(self.paths)
+        name = os.path.basename(path)
+        self.paths.append(path)
+        self.names.append(name)
+        self.ids[path] = file_id
+        for trigram in trigrams(name.lower()):
+            posting = self.postings.get(trigram)
+            if posting is None:
+                posting = self.postings[trigram] = array('I')
+            posting.append(file_id)
+
+    def remove(self, path):
+        file_id = self.ids.pop(path, None)
+        if file_id is None:
+            return
+        self.paths[file_id] = None
+        self.removed += 1
+        if self.removed > len(self.ids):
+            self.compact()
+
+    def update(self, changes):
+        for path in changes.get('removed', ()):
+            self.remove(path)
+        for path in changes.get('added', ()):
+            self.add(path)
+
+    def compact(self):
+        live = [path for path in self.paths if path is not None]
+        self.__init__()
+        for path in live:
+            self.add(path)
+
+    def _candidates(self, needle):
+        grams = trigrams(needle)
+        postings = []
+        for trigram in grams:
+            posting = self.postings.get(trigram)
+            if posting is None:
+                return []
+            postings.append(posting)
+        postings.sort(key=len)
+        shortest, others = postings[0], postings[1:]
+        return [file_id for file_id in shortest if all(_contains(other, file_id) for other in others)]
+
+    def search(self, search_term, case_sensitive=False):
+        needle = search_term.lower()
+        if len(needle) < 3:
+            candidates = range(len(self.paths))
+        else:
+            candidates = self._candidates(needle)
+
+        matches = []
+        for file_id in candidates:
+            path = self.paths[file_id]
+            if path is None:
+                continue
+            name = self.names[file_id]
+            if (search_term in name) if case_sensitive else (needle in name.lower()):
+                matches.append(path)
+        return matches
+
+    def to_bytes(self):
+        """Serialize to a plain binary layout (no pickle, so a planted file cannot run code).
+
+        Header, then the NUL-separated UTF-8 paths, then per trigram its
+        key and its little-endian uint32 posting list. An index with
+        tombstones stores only the live paths and is rebuilt on load.
+        """
+        paths = [path for path in self.paths if path is not None] if self.removed else self.paths
+        postings = {} if self.removed else self.postings
+        blob = '\0'.join(paths).encode('utf-8', 'surrogateescape')
+        parts = [_MAGIC, _HEADER.pack(not self.removed, len(paths), len(blob), len(postings)), blob]
+        for trigram, posting in postings.items():
+            key = trigram.encode('utf-8', 'surrogateescape')
+            if sys.byteorder != 'little':
+                posting = array('I', posting)
+                posting.byteswap()
+            parts.append(_POSTING.pack(len(key), len(posting)))
+            parts.append(key)
+            parts.append(posting.tobytes())
+        return b''.join(parts)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Inverse of to_bytes(); raises ValueError for anything it did not write."""
+        data = memoryview(data)
+        if data[:len(_MAGIC)] != _MAGIC:
+            raise ValueError("not a trigram index")
+        try:
+            offset = len(_MAGIC)
+            complete, count, blob_size, trigram_count = _HEADER.unpack_from(data, offset)
+            offset += _HEADER.size
+            if offset + blob_size > len(data):
+                raise ValueError("truncated path list")
+            blob = bytes(data[offset:offset + blob_size]).decode('utf-8', 'surrogateescape')
+            offset += blob_size
+            paths = blob.split('\0') if count else []
+            if len(paths) != count:
+                raise ValueError("path count does not match header")
+
+            index = cls()
+            if not complete:
+                if offset != len(data):
+                    raise ValueError("unexpected data after the path list")
+                for path in paths:
+                    index.add(path)
+                return index
+            index.paths = paths
+            index.names = [os.path.basename(path) for path in paths]
+            index.ids = {path: file_id for file_id, path in enumerate(paths)}
+            for _ in range(trigram_count):
+                key_size, length = _POSTING.unpack_from(data, offset)
+                offset += _POSTING.size
+                trigram = bytes(data[offset:offset + key_size]).decode('utf-8', 'surrogateescape')
+                offset += key_size
+                posting = array('I')
+                posting.frombytes(data[offset:offset + 4 * length])
+                offset += 4 * length
+                if len(posting) != length:
+                    raise ValueError("truncated posting list")
+                if sys.byteorder != 'little':
+                    posting.byteswap()
+                index.postings[trigram] = posting
+            if offset != len(data):
+                raise ValueError("unexpected data after the posting lists")
+        except struct.error as e:
+            raise ValueError(f"truncated trigram index: {e}") from None
+        return index
+
+    @classmethod
+    def build(cls, paths):
+        index = cls()
+        for path in paths:
+            index.add(path)
+        logger.info("Built trigram index over %d file names", len(index))
+        return index